@@ -2,22 +2,34 @@
 Collecting automaton output
 """
 
+import os
+import shutil
+import sys
 from time import time
 import argparse
-from typing import Dict, Optional
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, Type, Union
 
 
 import numpy
 
 
-from coffeematon.automatons.automaton import Automaton, ArrayTypes, InitialStates
-from coffeematon.automatons.nonint_automaton import NonInteractingAutomaton
+from coffeematon.automatons.automaton import (
+    SHAPED_STATES,
+    Automaton,
+    ArrayTypes,
+    InitialStates,
+)
+from coffeematon.automatons.nonint_automaton import (
+    Fluctuations,
+    NonInteractingAutomaton,
+)
 from coffeematon.automatons.int_automaton import InteractingAutomaton
 from coffeematon.automatons.fluid_automaton import FluidAutomaton
+from coffeematon.cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_SIZE, ResultCache
 from coffeematon.plot_results import plot_results
 
 
-AUTOMATONS: Dict[str, Automaton] = {
+AUTOMATONS: Dict[str, Type[Automaton]] = {
     "nonint": NonInteractingAutomaton,
     "int": InteractingAutomaton,
     "fluid": FluidAutomaton,
@@ -27,17 +39,67 @@ AUTOMATONS: Dict[str, Automaton] = {
 def experiment_for_n(
     automaton_type: str,
     n: int,
-    init: Optional[InitialStates] = None,
+    init: Optional[Union[InitialStates, str]] = None,
     save: bool = True,
-):
-    automaton: Automaton = AUTOMATONS.get(automaton_type)(n, init, save=save)
+    checkpoint_every: Optional[int] = None,
+    resume: bool = False,
+    max_save_steps: int = 1000,
+    cache: Optional[ResultCache] = None,
+    gif_every: int = 1,
+    gif_max_size: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+    **automaton_kwargs: Any,
+) -> Tuple[int, int, int, int]:
+    automaton: Automaton = AUTOMATONS[automaton_type](
+        n, init, save=save, **automaton_kwargs
+    )
+
+    config = dict(
+        automaton_kwargs,
+        automaton=automaton_type,
+        n=n,
+        init=automaton.initial_state.value,
+        n_steps=automaton.esttime,
+        max_save_steps=max_save_steps,
+        seed=automaton.seed,
+    )
+    # Unseeded runs are not reproducible, and are neither cached nor replayed
+    if automaton.seed is None:
+        cache = None
+    if cache is not None:
+        cached = cache.get(config)
+        # Runs cached without saving their results cannot provide them
+        if cached is not None and save and cached["csv_path"] is None:
+            cached = None
+        if cached is not None:
+            print(f"Using cached results for n={automaton.n}.")
+            if save:
+                results_path = automaton.csv_results_path()
+                os.makedirs(results_path.parent, exist_ok=True)
+                shutil.copyfile(cached["csv_path"], results_path)
+                plot_results(results_path)
+            stats = cached["stats"]
+            return (
+                stats["mix_time"],
+                stats["emax_val"],
+                stats["cmax_time"],
+                stats["cmax_val"],
+            )
 
     t_start = time()
-    csv_results_path = automaton.simulate()
+    csv_results_path = automaton.simulate(
+        max_save_steps=max_save_steps,
+        checkpoint_every=checkpoint_every,
+        resume=resume,
+        gif_every=gif_every,
+        gif_max_size=gif_max_size,
+        progress=progress,
+    )
     t_end = time()
     print(f"Time for n={automaton.n}: {t_end - t_start:.2E} sec.")
 
-    plot_results(csv_results_path)
+    if csv_results_path is not None:
+        plot_results(csv_results_path)
 
     # Return statistics
     mix_time = automaton.step
@@ -46,10 +108,27 @@ def experiment_for_n(
         numpy.argmax(automaton.complexities[ArrayTypes.COARSE_7])
     ]
     cmax_val = max(automaton.complexities[ArrayTypes.COARSE_7])
+    if cache is not None:
+        stats = {
+            "mix_time": mix_time,
+            "emax_val": emax_val,
+            "cmax_time": cmax_time,
+            "cmax_val": cmax_val,
+        }
+        cache.put(config, stats, csv_results_path)
     return (mix_time, emax_val, cmax_time, cmax_val)
 
 
-def data_for_range(type, start, stop, step=1):
+def data_for_range(
+    type: str,
+    start: int,
+    stop: int,
+    step: int = 1,
+    cache: Optional[ResultCache] = None,
+    seed: Optional[int] = None,
+) -> None:
+    if cache is None:
+        cache = ResultCache()
     ns = range(start, stop, step)
     mix_times = []
     emax_vals = []
@@ -59,13 +138,15 @@ def data_for_range(type, start, stop, step=1):
     t1 = time()
     for n in ns:
         # Collect statistics for each value of n
-        (mix_time, emax_val, cmax_time, cmax_val) = experiment_for_n(type, n)
+        mix_time, emax_val, cmax_time, cmax_val = experiment_for_n(
+            type, n, cache=cache, seed=seed
+        )
         mix_times.append(mix_time)
         emax_vals.append(emax_val)
         cmax_times.append(cmax_time)
         cmax_vals.append(cmax_val)
     t2 = time()
-    print(f"Total time: {t2 - t1:d} sec.")
+    print(f"Total time: {t2 - t1:.2E} sec.")
 
     # Save statistics to file
     f = open("stats_%s_%d_%d" % (type, start, stop - step), "w")
@@ -77,8 +158,9 @@ def data_for_range(type, start, stop, step=1):
     f.close()
 
 
-def main():
-    parser = argparse.ArgumentParser()
+def experiment_parser(size: bool = True, **kwargs: Any) -> argparse.ArgumentParser:
+    """Build the parser of the experiment arguments, without -n if size is False."""
+    parser = argparse.ArgumentParser(**kwargs)
     parser.add_argument(
         "-a",
         "--automaton",
@@ -86,20 +168,173 @@ def main():
         help="Type of automaton to use.",
         required=True,
     )
-    parser.add_argument(
-        "-n",
-        help="Size of the automaton.",
-        type=int,
-        required=True,
-    )
+    if size:
+        parser.add_argument(
+            "-n",
+            help="Size of the automaton.",
+            type=int,
+            required=True,
+        )
     parser.add_argument(
         "--init",
         help="Initial state of the automaton.",
         choices=[i.value for i in InitialStates],
         default="updown",
     )
-    args = parser.parse_args()
-    experiment_for_n(args.automaton, args.n, args.init)
+    parser.add_argument(
+        "--shapes",
+        help="Number of drops, stripes or blobs of the initial state.",
+        type=int,
+        default=3,
+    )
+    parser.add_argument(
+        "--shape-seed",
+        help="Seed of the random blobs of the initial state.",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        help="Number of snapshots between two checkpoints, 0 to disable them.",
+        type=int,
+        default=50,
+    )
+    parser.add_argument(
+        "--resume",
+        help="Resume the experiment from its last checkpoint if there is one.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--gif-every",
+        help="Keep one snapshot out of gif-every in the gifs.",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--gif-max-size",
+        help="Downscale gif frames to at most this number of pixels per side.",
+        type=int,
+    )
+    parser.add_argument(
+        "--tile-size",
+        help="Also measure tiled compression sizes with tiles of this size.",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "--seed",
+        help="Seed of the automaton random number generator.",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "--mean-field",
+        help="Evolve the expected density of the non-interacting automaton.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--fluctuations",
+        help="Sample particle noise around the mean-field density.",
+        choices=[f.value for f in Fluctuations],
+        default=None,
+    )
+    parser.add_argument(
+        "--adaptive",
+        help="Use CFL-controlled adaptive time steps for the fluid automaton.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--cfl",
+        help="CFL number of the adaptive time steps, in cells moved per step.",
+        type=float,
+        default=3.0,
+    )
+    parser.add_argument(
+        "--legacy-bytes",
+        help="Compress the raw bytes of arrays instead of their compact encoding.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--no-cache",
+        help="Always run the simulation instead of reusing results of seeded runs.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Directory of the results cache.",
+        default=DEFAULT_CACHE_DIR,
+    )
+    parser.add_argument(
+        "--cache-size",
+        help="Maximum size of the results cache in bytes.",
+        type=int,
+        default=DEFAULT_MAX_SIZE,
+    )
+    return parser
+
+
+def parse_experiment_args(
+    argv: Optional[Sequence[str]] = None,
+) -> Tuple[str, int, str, Dict[str, Any], Dict[str, Any]]:
+    """Parse the arguments of an experiment from the command line.
+
+    Returns the automaton type, size and initial state, the keyword arguments
+    of experiment_for_n and the keyword arguments of the automaton.
+    """
+    parser = experiment_parser(
+        epilog="Run 'plan' as the first argument to estimate the cost of runs."
+    )
+    args = parser.parse_args(argv)
+    experiment_kwargs, automaton_kwargs = experiment_kwargs_from_args(parser, args)
+    return args.automaton, args.n, args.init, experiment_kwargs, automaton_kwargs
+
+
+def experiment_kwargs_from_args(
+    parser: argparse.ArgumentParser, args: argparse.Namespace
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Return the keyword arguments of experiment_for_n and of the automaton."""
+    automaton_kwargs = {
+        "tile_size": args.tile_size,
+        "seed": args.seed,
+        "legacy_serialization": args.legacy_bytes,
+    }
+    if InitialStates(args.init) in SHAPED_STATES:
+        if args.shapes < 1:
+            parser.error("--shapes must be at least 1.")
+        automaton_kwargs.update(
+            {"n_shapes": args.shapes, "shape_seed": args.shape_seed}
+        )
+    if args.mean_field or args.fluctuations is not None:
+        if args.automaton != "nonint":
+            parser.error("--mean-field is only available for the nonint automaton.")
+        automaton_kwargs.update({"mean_field": True, "fluctuations": args.fluctuations})
+    if args.adaptive:
+        if args.automaton != "fluid":
+            parser.error("--adaptive is only available for the fluid automaton.")
+        automaton_kwargs.update({"adaptive": True, "cfl": args.cfl})
+    experiment_kwargs = {
+        "checkpoint_every": args.checkpoint_every,
+        "resume": args.resume,
+        "gif_every": args.gif_every,
+        "gif_max_size": args.gif_max_size,
+        "cache": (
+            None if args.no_cache else ResultCache(args.cache_dir, args.cache_size)
+        ),
+    }
+    return experiment_kwargs, automaton_kwargs
+
+
+def main():
+    if sys.argv[1:2] == ["plan"]:
+        from coffeematon.planner import main as plan_main
+
+        plan_main(sys.argv[2:])
+        return
+
+    automaton_type, n, init, experiment_kwargs, automaton_kwargs = (
+        parse_experiment_args()
+    )
+    experiment_for_n(automaton_type, n, init, **experiment_kwargs, **automaton_kwargs)
 
 
 if __name__ == "__main__":
@@ -1,19 +1,47 @@
 import os
+import pickle
 import shutil
 import numpy as np
+from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
-from typing import Optional, Dict, List
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+    Dict,
+    List,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 from abc import abstractmethod
 from csv import DictWriter
 
-from tqdm import trange
+from tqdm import tqdm
 
 from coffeematon.coarse_grain import coarse_grained, smooth
 from coffeematon.diff_encoding import generate_diff
-from coffeematon.encoding import zip_array
-from coffeematon.generate_gifs import generate_gif
+from coffeematon.encoding import (
+    DeltaZipper,
+    Serialization,
+    TiledZipper,
+    conditional_entropy,
+    level_indices,
+    run_length_entropy,
+    zip_array,
+)
+from coffeematon.generate_gifs import GifWriter, array_to_frame, generate_gifs
+from coffeematon.initial_states import (
+    blobs_mask,
+    circular_mask,
+    drops_mask,
+    stripes_mask,
+    updown_mask,
+)
 from PIL import Image
 
 
@@ -28,30 +56,174 @@ class ArrayTypes(Enum):
     MASK_3 = "mask_3"
     MASK_7 = "mask_7"
     MASK_11 = "mask_11"
+    RLE_FINE = "rle_fine"
+    RLE_COARSE_3 = "rle_coarse_3"
+    CONDH_FINE = "condh_fine"
+    CONDH_COARSE_3 = "condh_coarse_3"
+    TILED_FINE = "tiled_fine"
+    TILED_COARSE_3 = "tiled_coarse_3"
+    TILED_COARSE_7 = "tiled_coarse_7"
+    TILED_COARSE_11 = "tiled_coarse_11"
+    TILED_DIFF_3 = "tiled_diff_3"
+    TILED_DIFF_7 = "tiled_diff_7"
+    TILED_DIFF_11 = "tiled_diff_11"
+    TILED_MASK_3 = "tiled_mask_3"
+    TILED_MASK_7 = "tiled_mask_7"
+    TILED_MASK_11 = "tiled_mask_11"
+    TEMPORAL_FINE = "temporal_fine"
+    TEMPORAL_COARSE_3 = "temporal_coarse_3"
+    TEMPORAL_COARSE_7 = "temporal_coarse_7"
+    TEMPORAL_COARSE_11 = "temporal_coarse_11"
+    TEMPORAL_DIFF_3 = "temporal_diff_3"
+    TEMPORAL_DIFF_7 = "temporal_diff_7"
+    TEMPORAL_DIFF_11 = "temporal_diff_11"
+    TEMPORAL_MASK_3 = "temporal_mask_3"
+    TEMPORAL_MASK_7 = "temporal_mask_7"
+    TEMPORAL_MASK_11 = "temporal_mask_11"
     # MDL_COMPLEXITY = "mdlc"
     # MDL_ENTROPY = "mdle"
 
 
+# Array types estimated analytically from another array type instead of gzip.
+ESTIMATORS: Dict[ArrayTypes, Tuple[ArrayTypes, Callable[[np.ndarray], int]]] = {
+    ArrayTypes.RLE_FINE: (ArrayTypes.FINE, run_length_entropy),
+    ArrayTypes.RLE_COARSE_3: (ArrayTypes.COARSE_3, run_length_entropy),
+    ArrayTypes.CONDH_FINE: (ArrayTypes.FINE, conditional_entropy),
+    ArrayTypes.CONDH_COARSE_3: (ArrayTypes.COARSE_3, conditional_entropy),
+}
+
+# Estimators of the fine array, only measured when the cells take discrete values
+# since every neighbourhood of a continuous grid is new.
+FINE_ESTIMATORS = {
+    c_type for c_type, (source, _) in ESTIMATORS.items() if source is ArrayTypes.FINE
+}
+
+# Estimators costing about as much as the gzip size they estimate on large
+# grids, only measured when selected.
+OPT_IN_ESTIMATORS = {ArrayTypes.CONDH_COARSE_3}
+
+# Array types measured by tiled compression of another array type.
+TILED: Dict[ArrayTypes, ArrayTypes] = {
+    ArrayTypes.TILED_FINE: ArrayTypes.FINE,
+    ArrayTypes.TILED_COARSE_3: ArrayTypes.COARSE_3,
+    ArrayTypes.TILED_COARSE_7: ArrayTypes.COARSE_7,
+    ArrayTypes.TILED_COARSE_11: ArrayTypes.COARSE_11,
+    ArrayTypes.TILED_DIFF_3: ArrayTypes.DIFF_3,
+    ArrayTypes.TILED_DIFF_7: ArrayTypes.DIFF_7,
+    ArrayTypes.TILED_DIFF_11: ArrayTypes.DIFF_11,
+    ArrayTypes.TILED_MASK_3: ArrayTypes.MASK_3,
+    ArrayTypes.TILED_MASK_7: ArrayTypes.MASK_7,
+    ArrayTypes.TILED_MASK_11: ArrayTypes.MASK_11,
+}
+
+# Array types measured by compression conditioned on the previous snapshot.
+TEMPORAL: Dict[ArrayTypes, ArrayTypes] = {
+    ArrayTypes.TEMPORAL_FINE: ArrayTypes.FINE,
+    ArrayTypes.TEMPORAL_COARSE_3: ArrayTypes.COARSE_3,
+    ArrayTypes.TEMPORAL_COARSE_7: ArrayTypes.COARSE_7,
+    ArrayTypes.TEMPORAL_COARSE_11: ArrayTypes.COARSE_11,
+    ArrayTypes.TEMPORAL_DIFF_3: ArrayTypes.DIFF_3,
+    ArrayTypes.TEMPORAL_DIFF_7: ArrayTypes.DIFF_7,
+    ArrayTypes.TEMPORAL_DIFF_11: ArrayTypes.DIFF_11,
+    ArrayTypes.TEMPORAL_MASK_3: ArrayTypes.MASK_3,
+    ArrayTypes.TEMPORAL_MASK_7: ArrayTypes.MASK_7,
+    ArrayTypes.TEMPORAL_MASK_11: ArrayTypes.MASK_11,
+}
+
+# Number of categories of each coarse-graining with its coarse, diff and mask types.
+COARSE_GRAININGS: List[Tuple[int, ArrayTypes, ArrayTypes, ArrayTypes]] = [
+    (3, ArrayTypes.COARSE_3, ArrayTypes.DIFF_3, ArrayTypes.MASK_3),
+    (7, ArrayTypes.COARSE_7, ArrayTypes.DIFF_7, ArrayTypes.MASK_7),
+    (11, ArrayTypes.COARSE_11, ArrayTypes.DIFF_11, ArrayTypes.MASK_11),
+]
+
+# Compact serialization of each array before compression.
+SERIALIZATIONS: Dict[ArrayTypes, Serialization] = {
+    ArrayTypes.FINE: Serialization.CATEGORIES,
+    ArrayTypes.COARSE_3: Serialization.LEVELS,
+    ArrayTypes.COARSE_7: Serialization.LEVELS,
+    ArrayTypes.COARSE_11: Serialization.LEVELS,
+    ArrayTypes.DIFF_3: Serialization.DIFF,
+    ArrayTypes.DIFF_7: Serialization.DIFF,
+    ArrayTypes.DIFF_11: Serialization.DIFF,
+    ArrayTypes.MASK_3: Serialization.BITS,
+    ArrayTypes.MASK_7: Serialization.BITS,
+    ArrayTypes.MASK_11: Serialization.BITS,
+}
+
+
+def source_type(c_type: ArrayTypes) -> ArrayTypes:
+    """Return the array type whose array is needed to measure the given type."""
+    if c_type in ESTIMATORS:
+        return ESTIMATORS[c_type][0]
+    if c_type in TILED:
+        return TILED[c_type]
+    if c_type in TEMPORAL:
+        return TEMPORAL[c_type]
+    return c_type
+
+
 class InitialStates(Enum):
     UPDOWN = "updown"
     CIRCULAR = "circular"
+    DROPS = "drops"
+    STRIPES = "stripes"
+    BLOBS = "blobs"
+
+
+# Initial states parameterised by a number of shapes
+SHAPED_STATES = {InitialStates.DROPS, InitialStates.STRIPES, InitialStates.BLOBS}
+
+
+@dataclass
+class Snapshot:
+    """Arrays and complexities measured at one step of a simulation."""
+
+    step: int
+    arrays: Dict[ArrayTypes, np.ndarray]
+    complexities: Dict[ArrayTypes, int]
 
 
 class Automaton:
     NAME = "GENERIC"
 
     def __init__(
-        self, n, initial_state: Optional[InitialStates] = None, save: bool = True
+        self,
+        n: int,
+        initial_state: Optional[Union[InitialStates, str]] = None,
+        save: bool = True,
+        tile_size: Optional[int] = None,
+        seed: Optional[int] = None,
+        legacy_serialization: bool = False,
+        n_shapes: int = 3,
+        shape_seed: int = 0,
     ):
         self.n = n
         if initial_state is None:
             initial_state = InitialStates.UPDOWN
 
         self.initial_state = InitialStates(initial_state)
-        self.cells = np.zeros((n, n))
+        # Number of drops, stripes or blobs, and seed of the blobs
+        if n_shapes < 1:
+            raise ValueError(f"n_shapes must be at least 1, got {n_shapes}.")
+        self.n_shapes = n_shapes
+        self.shape_seed = shape_seed
+        # Subclasses build their internal representation in set_initial_state
+        self._cells: Optional[np.ndarray] = np.zeros((n, n))
         self.step = 0
-        self.steps = []
-        self.complexities = {complexity: [] for complexity in ArrayTypes}
+        self.steps: List[int] = []
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        # Tiled compression is only measured when a tile size is given
+        self.tiled_zipper = TiledZipper(tile_size) if tile_size else None
+        self.delta_zipper = DeltaZipper()
+        self.complexities: Dict[ArrayTypes, List[int]] = {
+            complexity: []
+            for complexity in ArrayTypes
+            if (tile_size or complexity not in TILED)
+            and (self.has_discrete_cells() or complexity not in FINE_ESTIMATORS)
+            and complexity not in OPT_IN_ESTIMATORS
+        }
         self.esttime = self.timesteps()
         self.results_dir = Path("data", "results")
         # Compute grain size
@@ -61,133 +233,420 @@ class Automaton:
         self.grainsize = grainsize
         # Set max value for coarse-grained image thresholding
         self.maxval = 1.0
-        self.parameters = (self.initial_state.value, self.NAME, str(self.n))
+        self.parameters: Tuple[str, ...] = (
+            self.initial_state_label(),
+            self.NAME,
+            str(self.n),
+        )
+        # Runs of different seeds must not overwrite each other's results
+        if self.seed is not None:
+            self.parameters += (f"seed-{self.seed}",)
         self.save = save
+        # Compress raw array bytes instead of their compact serialization
+        self.legacy_serialization = legacy_serialization
+
+    @property
+    def cells(self) -> np.ndarray:
+        """Observed grid of the automaton.
+
+        Automata may keep an internal representation different from the observed
+        grid, in which case they call invalidate_cells when it changes and the grid
+        is only produced by _materialize_cells when it is next read. Assigned
+        grids are loaded back into the internal representation by _load_cells.
+        """
+        if self._cells is None:
+            self._cells = self._materialize_cells()
+        return self._cells
+
+    @cells.setter
+    def cells(self, cells: np.ndarray) -> None:
+        self._cells = cells
+        self._load_cells(cells)
+
+    def _load_cells(self, cells: np.ndarray) -> None:
+        """Rebuild the internal representation from an assigned observed grid.
+
+        Automata whose observed grid is their whole state have nothing to rebuild.
+        """
+
+    def invalidate_cells(self):
+        """Drop the cached observed grid after the internal state changed."""
+        self._cells = None
+
+    def _materialize_cells(self) -> np.ndarray:
+        """Produce the observed grid from the internal representation."""
+        raise NotImplementedError(
+            f"{type(self).__name__} keeps no internal representation to observe."
+        )
 
     @staticmethod
-    def parameters_to_str(parameters: List[str]):
+    def parameters_to_str(parameters: Sequence[str]) -> str:
         return "_".join([param.lower() for param in parameters])
 
     @staticmethod
-    def str_to_parameters(parameters_string: str):
+    def str_to_parameters(parameters_string: str) -> List[str]:
         return parameters_string.split("_")
 
-    def set_initial_state(self):
+    def has_discrete_cells(self) -> bool:
+        """Whether the cells take a few discrete values, like particle counts."""
+        return True
+
+    def initial_state_label(self) -> str:
+        """Name of the initial state with its shape parameters."""
+        label = self.initial_state.value
+        if self.initial_state in SHAPED_STATES:
+            label += f"-{self.n_shapes}"
+        if self.initial_state is InitialStates.BLOBS:
+            label += f"-{self.shape_seed}"
+        return label
+
+    def initial_mask(self) -> np.ndarray:
+        """Return the cached read-only mask of the initially filled cells."""
         if self.initial_state is InitialStates.UPDOWN:
-            self.cells[: self.n // 2, : self.n] = 1.0
-        elif self.initial_state is InitialStates.CIRCULAR:
-            for x in range(self.n):
-                for y in range(self.n):
-                    if (
-                        np.sqrt((x - self.n / 2) ** 2 + (y - self.n / 2) ** 2)
-                        < self.n / 4
-                    ):
-                        self.cells[x, y] = 1.0
+            return updown_mask(self.n)
+        if self.initial_state is InitialStates.CIRCULAR:
+            return circular_mask(self.n)
+        if self.initial_state is InitialStates.DROPS:
+            return drops_mask(self.n, self.n_shapes)
+        if self.initial_state is InitialStates.STRIPES:
+            return stripes_mask(self.n, self.n_shapes)
+        if self.initial_state is InitialStates.BLOBS:
+            return blobs_mask(self.n, self.n_shapes, self.shape_seed)
+        raise NotImplementedError()
+
+    def set_initial_state(self):
+        self.cells = self.initial_mask().astype(float)
 
     @abstractmethod
     def next(self):
         """Move the automaton one state ahead by switching two cells."""
 
+    def advance(self, k: int) -> None:
+        """Move the automaton k states ahead.
+
+        Subclasses should override this with a native multi-step implementation,
+        the default one calls next k times.
+        """
+        for _ in range(k):
+            self.next()
+
     @abstractmethod
     def timesteps(self):
         """Return the estimated number of steps to convergence for the automaton."""
 
     def simulate(
-        self, n_steps: Optional[int] = None, max_save_steps: int = 1000
-    ) -> Path:
-        """Simulate the automaton until convergence is reached."""
-        self.set_initial_state()
-
+        self,
+        n_steps: Optional[int] = None,
+        max_save_steps: int = 1000,
+        checkpoint_every: Optional[int] = None,
+        resume: bool = False,
+        array_types: Optional[Iterable[ArrayTypes]] = None,
+        gif_every: int = 1,
+        gif_max_size: Optional[int] = None,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> Optional[Path]:
+        """Simulate the automaton until convergence is reached.
+
+        Results are saved to the results directory if save is True, in which case
+        the path of the csv results file is returned.
+        If checkpoint_every is given, a checkpoint is written every
+        checkpoint_every snapshots. If resume is True and a checkpoint of the same
+        experiment exists, the simulation continues from it instead of starting
+        over from the initial state.
+        Gifs keep one snapshot out of gif_every, downscaled to at most
+        gif_max_size pixels. They are encoded as snapshots are taken, except
+        for resumed simulations whose gifs are rendered from the bitmaps.
+        If given, progress is called with the step and the total number of steps
+        after each snapshot.
+        """
         if n_steps is None:
             n_steps = self.esttime
+        if array_types is not None:
+            self.select_array_types(array_types)
+
+        checkpoint = None
+        if resume:
+            checkpoint = self.load_checkpoint(n_steps, max_save_steps)
+        start_step = 0
+        if checkpoint is None:
+            self.start()
+        else:
+            start_step = self.step + 1
 
         bitmaps_dir = None
         csv_path = None
+        gif_writers: Dict[ArrayTypes, GifWriter] = {}
         if self.save:
-            bitmaps_dir = self.create_bitmaps_results_folder()
-            csv_path = self.create_csv_results_file()
-
-        loadbar = trange(n_steps, total=n_steps, desc="Simulating")
-        for step in loadbar:
-            self.step = step
-            save_stepsize = n_steps // max_save_steps
-            if (save_stepsize == 0) or (step % save_stepsize) == 0:
-                smoothed = smooth(self.cells, self.grainsize)
-                coarse_3 = coarse_grained(smoothed, self.maxval, 3)
-                coarse_7 = coarse_grained(smoothed, self.maxval, 7)
-                coarse_11 = coarse_grained(smoothed, self.maxval, 11)
-
-                diff3, mask3 = generate_diff(self.cells, coarse_3)
-                diff7, mask7 = generate_diff(self.cells, coarse_7)
-                diff11, mask11 = generate_diff(self.cells, coarse_11)
-
-                c_type_to_arr = {
-                    ArrayTypes.FINE: self.cells,
-                    ArrayTypes.COARSE_3: coarse_3,
-                    ArrayTypes.COARSE_7: coarse_7,
-                    ArrayTypes.COARSE_11: coarse_11,
-                    ArrayTypes.DIFF_3: diff3,
-                    ArrayTypes.DIFF_7: diff7,
-                    ArrayTypes.DIFF_11: diff11,
-                    ArrayTypes.MASK_3: mask3,
-                    ArrayTypes.MASK_7: mask7,
-                    ArrayTypes.MASK_11: mask11,
-                }
+            bitmaps_dir = self.create_bitmaps_results_folder(clear=checkpoint is None)
+            csv_path = self.create_csv_results_file(
+                position=None if checkpoint is None else checkpoint["csv_position"]
+            )
+            if checkpoint is None:
+                gif_writers = self.open_gif_writers(gif_every, gif_max_size)
+
+        try:
+            for snapshot in self._iter_snapshots(n_steps, max_save_steps, start_step):
+                if csv_path is not None and bitmaps_dir is not None:
+                    self.save_results(csv_path)
+                    self.save_images(bitmaps_dir, snapshot.step, snapshot.arrays)
+                for c_type, gif_writer in gif_writers.items():
+                    gif_writer.append(array_to_frame(snapshot.arrays[c_type]))
+                if checkpoint_every and len(self.steps) % checkpoint_every == 0:
+                    self.save_checkpoint(n_steps, max_save_steps, csv_path)
+                if progress is not None:
+                    progress(snapshot.step, n_steps)
+        except BaseException:
+            for gif_writer in gif_writers.values():
+                gif_writer.abort()
+            raise
+
+        for gif_writer in gif_writers.values():
+            gif_writer.close()
+        if bitmaps_dir is not None and checkpoint is not None:
+            self.save_gifs(bitmaps_dir, gif_every, gif_max_size)
+        if os.path.exists(self.checkpoint_path()):
+            os.remove(self.checkpoint_path())
+
+        return csv_path
 
+    def iter_snapshots(
+        self,
+        n_steps: Optional[int] = None,
+        max_save_steps: int = 1000,
+        array_types: Optional[Iterable[ArrayTypes]] = None,
+    ) -> Iterator[Snapshot]:
+        """Simulate the automaton from its initial state, yielding each snapshot.
+
+        Nothing is written to disk. Only the given array types are measured,
+        all the automaton array types by default. Yielded arrays are copies that
+        remain valid while the simulation continues.
+        """
+        if n_steps is None:
+            n_steps = self.esttime
+        if array_types is not None:
+            self.select_array_types(array_types)
+        self.start()
+        yield from self._iter_snapshots(n_steps, max_save_steps)
+
+    def start(self):
+        """Reset the automaton to its initial state at step 0, without results."""
+        self.rng = np.random.default_rng(self.seed)
+        self.set_initial_state()
+        self.step = 0
+        self.steps = []
+        self.complexities = {c_type: [] for c_type in self.complexities}
+        self.delta_zipper.reset()
+
+    def _iter_snapshots(
+        self, n_steps: int, max_save_steps: int, start_step: int = 0
+    ) -> Iterator[Snapshot]:
+        """Advance the automaton from self.step, yielding snapshots from start_step."""
+        save_stepsize = max(n_steps // max_save_steps, 1)
+        first_snapshot = -(-start_step // save_stepsize) * save_stepsize
+        loadbar = tqdm(total=n_steps, initial=self.step, desc="Simulating")
+        # Release the tiled zipper threads however the iteration ends
+        try:
+            for step in range(first_snapshot, n_steps, save_stepsize):
+                self.advance(step - self.step)
+                loadbar.update(step - self.step)
+                self.step = step
+
+                c_type_to_arr = self.compute_arrays()
                 self.steps.append(step)
-                self.compute_complexities(c_type_to_arr)
-                if self.save:
-                    self.save_results(csv_path)
-                    self.save_images(bitmaps_dir, step, c_type_to_arr)
+                complexities = self.compute_complexities(c_type_to_arr)
 
                 # Loadbar display
                 relevant_types = [ArrayTypes.FINE, ArrayTypes.COARSE_3]
                 relevant_params = [
-                    f"{c_type.value.capitalize()}: {self.complexities[c_type][-1]:.2E}"
+                    f"{c_type.value.capitalize()}: {complexities[c_type]:.2E}"
                     for c_type in relevant_types
+                    if c_type in complexities
                 ]
-                loadbar.desc = " | ".join(["Simulating"] + relevant_params)
-                loadbar.update()
-            self.next()
-
-        if self.save:
-            self.save_gifs(bitmaps_dir)
-
-        return csv_path
+                loadbar.set_description(" | ".join(["Simulating"] + relevant_params))
+
+                yield Snapshot(step, c_type_to_arr, complexities)
+
+            # Run until the last step like a step by step simulation would
+            if self.step < n_steps - 1:
+                self.advance(n_steps - 1 - self.step)
+                loadbar.update(n_steps - 1 - self.step)
+                self.step = n_steps - 1
+        finally:
+            loadbar.close()
+            if self.tiled_zipper is not None:
+                self.tiled_zipper.close()
+
+    def select_array_types(self, array_types: Iterable[ArrayTypes]) -> None:
+        """Restrict the measured array types, resetting the recorded results."""
+        array_types = [ArrayTypes(c_type) for c_type in array_types]
+        if self.tiled_zipper is None and any(c_type in TILED for c_type in array_types):
+            raise ValueError("Tiled array types require a tile_size.")
+        self.steps = []
+        self.complexities = {c_type: [] for c_type in array_types}
 
-    def create_csv_results_file(self) -> str:
-        csvs_dir = self.results_dir / "csvs"
-        os.makedirs(csvs_dir, exist_ok=True)
+    def checkpoint_path(self) -> Path:
+        parameters = self.parameters_to_str(self.parameters)
+        return self.results_dir / "checkpoints" / f"{parameters}.pkl"
+
+    def get_config(self) -> Dict[str, Any]:
+        """Return the settings that determine the trajectory and its measures."""
+        return {
+            "name": self.NAME,
+            "n": self.n,
+            "initial_state": self.initial_state_label(),
+            "seed": self.seed,
+            "tile_size": self.tiled_zipper.tile_size if self.tiled_zipper else None,
+            "legacy_serialization": self.legacy_serialization,
+        }
+
+    def get_checkpoint_state(self) -> Dict[str, Any]:
+        """Return the internal state needed to continue the exact same trajectory."""
+        return {
+            "cells": self.cells.copy(),
+            "rng": self.rng.bit_generator.state,
+        }
+
+    def set_checkpoint_state(self, state: Dict[str, Any]) -> None:
+        """Restore the internal state returned by get_checkpoint_state."""
+        self.cells = state["cells"].copy()
+        self.rng.bit_generator.state = state["rng"]
+
+    def save_checkpoint(
+        self, n_steps: int, max_save_steps: int, csv_path: Optional[Path] = None
+    ) -> None:
+        """Atomically write the current simulation state to the checkpoint file."""
+        checkpoint = {
+            "config": self.get_config(),
+            "array_types": [c_type.value for c_type in self.complexities],
+            "n_steps": n_steps,
+            "max_save_steps": max_save_steps,
+            "step": self.step,
+            "steps": list(self.steps),
+            "complexities": {
+                c_type.value: list(c_vals)
+                for c_type, c_vals in self.complexities.items()
+            },
+            "csv_position": os.path.getsize(csv_path) if csv_path else None,
+            "state": self.get_checkpoint_state(),
+            "previous_snapshot": dict(self.delta_zipper.previous),
+        }
+        checkpoint_path = self.checkpoint_path()
+        os.makedirs(checkpoint_path.parent, exist_ok=True)
+        tmp_path = checkpoint_path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as checkpoint_file:
+            pickle.dump(checkpoint, checkpoint_file)
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.replace(tmp_path, checkpoint_path)
+
+    def load_checkpoint(
+        self, n_steps: int, max_save_steps: int
+    ) -> Optional[Dict[str, Any]]:
+        """Restore the simulation state from the checkpoint file if there is one."""
+        checkpoint_path = self.checkpoint_path()
+        if not os.path.exists(checkpoint_path):
+            return None
+        with open(checkpoint_path, "rb") as checkpoint_file:
+            checkpoint = pickle.load(checkpoint_file)
+        if (checkpoint["n_steps"], checkpoint["max_save_steps"]) != (
+            n_steps,
+            max_save_steps,
+        ):
+            raise ValueError(
+                f"Checkpoint {checkpoint_path} was made with n_steps="
+                f"{checkpoint['n_steps']} and max_save_steps="
+                f"{checkpoint['max_save_steps']}, cannot resume with n_steps="
+                f"{n_steps} and max_save_steps={max_save_steps}."
+            )
+        # Checkpoints of older versions have no configuration and never match
+        saved_config = checkpoint.get("config", {})
+        mismatches = [
+            f"{key}={saved_config.get(key)!r} instead of {value!r}"
+            for key, value in self.get_config().items()
+            if saved_config.get(key) != value
+        ]
+        array_types = [c_type.value for c_type in self.complexities]
+        if checkpoint.get("array_types") != array_types:
+            mismatches.append(
+                f"array types {checkpoint['array_types']} instead of {array_types}"
+            )
+        if mismatches:
+            raise ValueError(
+                f"Checkpoint {checkpoint_path} was made with "
+                f"{', '.join(mismatches)}, cannot resume."
+            )
+        self.step = checkpoint["step"]
+        self.steps = list(checkpoint["steps"])
+        self.complexities = {
+            c_type: list(checkpoint["complexities"][c_type.value])
+            for c_type in self.complexities
+        }
+        self.set_checkpoint_state(checkpoint["state"])
+        self.delta_zipper.previous = dict(checkpoint["previous_snapshot"])
+        return checkpoint
+
+    def csv_results_path(self) -> Path:
         parameters = self.parameters_to_str(self.parameters)
-        filename = f"{parameters}.csv"
-        results_path = csvs_dir / filename
+        return self.results_dir / "csvs" / f"{parameters}.csv"
+
+    def create_csv_results_file(self, position: Optional[int] = None) -> Path:
+        results_path = self.csv_results_path()
+        os.makedirs(results_path.parent, exist_ok=True)
 
         self.results_fields = ["Timestep"] + [
             c_type.value.capitalize() for c_type in self.complexities.keys()
         ]
+        if position is not None:
+            # Drop results written after the checkpoint we resume from
+            with open(results_path, "r+") as results_file:
+                results_file.truncate(position)
+            return results_path
         with open(results_path, "w") as results_file:
             writer = DictWriter(results_file, self.results_fields)
             writer.writeheader()
         return results_path
 
-    def save_gifs(self, bitmaps_dir: Path):
+    def gif_paths(self) -> Dict[ArrayTypes, Path]:
+        """Return the gif path of each array type saved as images."""
         gifs_dir = self.results_dir / "gifs"
         os.makedirs(gifs_dir, exist_ok=True)
-        for c_type in self.complexities.keys():
-            gif_type = c_type.value
-            parameters = self.parameters_to_str(self.parameters)
-            gif_path = gifs_dir / f"{parameters}_{gif_type}.gif"
-            generate_gif(bitmaps_dir / gif_type, gif_path)
+        parameters = self.parameters_to_str(self.parameters)
+        return {
+            c_type: gifs_dir / f"{parameters}_{c_type.value}.gif"
+            for c_type in self.complexities.keys()
+            if source_type(c_type) is c_type
+        }
+
+    def open_gif_writers(
+        self, every: int = 1, max_size: Optional[int] = None
+    ) -> Dict[ArrayTypes, GifWriter]:
+        return {
+            c_type: GifWriter(gif_path, every, max_size)
+            for c_type, gif_path in self.gif_paths().items()
+        }
+
+    def save_gifs(
+        self, bitmaps_dir: Path, every: int = 1, max_size: Optional[int] = None
+    ) -> None:
+        """Render the gifs of all array types from their bitmaps in parallel."""
+        generate_gifs(
+            [
+                (bitmaps_dir / c_type.value, gif_path)
+                for c_type, gif_path in self.gif_paths().items()
+            ],
+            every,
+            max_size,
+        )
 
-    def create_bitmaps_results_folder(self) -> Path:
+    def create_bitmaps_results_folder(self, clear: bool = True) -> Path:
         bitmaps_dir = self.results_dir / "bitmaps"
         for param in self.parameters:
             bitmaps_dir /= param
-        if os.path.exists(bitmaps_dir):
+        if clear and os.path.exists(bitmaps_dir):
             shutil.rmtree(bitmaps_dir)
         return bitmaps_dir
 
-    def save_results(self, results_path: Path):
+    def save_results(self, results_path: Path) -> None:
         TIMESTEPS = self.results_fields[0]
         results = {TIMESTEPS: self.step}
         results.update(
@@ -200,21 +659,76 @@ class Automaton:
             results_writer = DictWriter(results_file, self.results_fields)
             results_writer.writerow(results)
 
-    def compute_complexities(self, c_type_to_arr: Dict[ArrayTypes, np.ndarray]):
-        for c_type, arr in c_type_to_arr.items():
-            c_val = zip_array(arr)
-            self.complexities[c_type].append(c_val)
+    def compute_arrays(self) -> Dict[ArrayTypes, np.ndarray]:
+        """Compute the arrays needed to measure the selected array types."""
+        required = {source_type(c_type) for c_type in self.complexities}
+        c_type_to_arr = {ArrayTypes.FINE: self.cells.copy()}
+        smoothed = None
+        for n_categories, coarse_type, diff_type, mask_type in COARSE_GRAININGS:
+            if not required & {coarse_type, diff_type, mask_type}:
+                continue
+            if smoothed is None:
+                smoothed = smooth(self.cells, self.grainsize)
+            coarse = coarse_grained(smoothed, self.maxval, n_categories)
+            c_type_to_arr[coarse_type] = coarse
+            if required & {diff_type, mask_type}:
+                diff, mask = generate_diff(self.cells, coarse)
+                c_type_to_arr[diff_type] = diff
+                c_type_to_arr[mask_type] = mask
+        return {
+            c_type: arr for c_type, arr in c_type_to_arr.items() if c_type in required
+        }
+
+    def compute_complexities(
+        self, c_type_to_arr: Dict[ArrayTypes, np.ndarray]
+    ) -> Dict[ArrayTypes, int]:
+        complexities = {}
+        for c_type, c_vals in self.complexities.items():
+            arr = c_type_to_arr[source_type(c_type)]
+            serialization = self.serialization(c_type)
+            bin_size = self.bin_size(c_type)
+            if c_type in ESTIMATORS:
+                levels = None if bin_size is None else level_indices(arr, bin_size)
+                c_val = ESTIMATORS[c_type][1](arr if levels is None else levels)
+            elif c_type in TILED and self.tiled_zipper is not None:
+                c_val = self.tiled_zipper.zip_array(arr, serialization, bin_size)
+            elif c_type in TEMPORAL:
+                c_val = self.delta_zipper.zip_array(
+                    c_type, arr, serialization, bin_size
+                )
+            else:
+                c_val = zip_array(arr, serialization=serialization, bin_size=bin_size)
+            c_vals.append(c_val)
+            complexities[c_type] = c_val
 
         # mdl_complexity, mdl_entropy = encoded_sizes(self.cells)
         # self.complexities[Complexities.MDL_COMPLEXITY].append(mdl_complexity)
         # self.complexities[Complexities.MDL_ENTROPY].append(mdl_entropy)
+        return complexities
+
+    def serialization(self, c_type: ArrayTypes) -> Serialization:
+        """Return how arrays of the given type are serialized before compression."""
+        if self.legacy_serialization:
+            return Serialization.RAW
+        serialization = SERIALIZATIONS[source_type(c_type)]
+        # Deltas between snapshots need a serialization of fixed length
+        if c_type in TEMPORAL and serialization is Serialization.DIFF:
+            return Serialization.DIFF_GRID
+        return serialization
+
+    def bin_size(self, c_type: ArrayTypes) -> Optional[float]:
+        """Return the nominal bin size of coarse-grained arrays of the given type."""
+        for n_categories, coarse_type, _, _ in COARSE_GRAININGS:
+            if source_type(c_type) is coarse_type:
+                return self.maxval / (n_categories - 1)
+        return None
 
     def save_images(
         self,
         bitmaps_dir: Path,
         step: int,
         c_type_to_arr: Dict[ArrayTypes, np.ndarray],
-    ):
+    ) -> None:
         for c_type, arr in c_type_to_arr.items():
             if arr is None:
                 continue
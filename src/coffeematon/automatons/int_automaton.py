@@ -1,6 +1,12 @@
-import random
+import numpy as np
 
-from coffeematon.automatons.automaton import Automaton, InitialStates
+from coffeematon.automatons.automaton import Automaton
+
+# Cell offsets for each of the four directions a cell can be swapped towards
+DIRECTIONS_X = np.array([-1, 1, 0, 0])
+DIRECTIONS_Y = np.array([0, 0, -1, 1])
+# Maximum number of random swaps drawn at once
+CHUNK_SIZE = 1 << 16
 
 
 class InteractingAutomaton(Automaton):
@@ -8,33 +14,37 @@ class InteractingAutomaton(Automaton):
 
     def next(self):
         """Move the automaton one state ahead by switching two cells."""
-        # Randomly pick a cell to move
-        x0 = random.randrange(0, self.n)
-        y0 = random.randrange(0, self.n)
-        xd = 0
-        yd = 0
-        # Randomly pick a direction
-        direction = random.randrange(0, 4)
-        if direction == 0:
-            xd = -1
-        if direction == 1:
-            xd = 1
-        if direction == 2:
-            yd = -1
-        if direction == 3:
-            yd = 1
-        # Pick again if cells are same, or swap if different
-        x1 = max(0, min(self.n - 1, x0 + xd))
-        y1 = max(0, min(self.n - 1, y0 + yd))
-        if (x0 == x1 and y0 == y1) or (self.cells[y0][x0] == self.cells[y1][x1]):
+        self.advance(1)
+
+    def advance(self, k: int) -> None:
+        """Move the automaton k states ahead by switching k pairs of cells.
+
+        Each step picks a random cell and a random direction, and swaps the cell
+        with its neighbour in that direction if they are different. Swapping two
+        identical cells, or a cell with itself at a wall, leaves the grid
+        unchanged so swaps are applied unconditionally on a flat list of cells,
+        which is kept between calls as the internal representation.
+        """
+        if k == 0:
             return
-        self.cells[y0][x0], self.cells[y1][x1] = (
-            self.cells[y1][x1],
-            self.cells[y0][x0],
-        )
+        n = self.n
+        cells = self._flat_cells
+        for start in range(0, k, CHUNK_SIZE):
+            size = min(CHUNK_SIZE, k - start)
+            # Randomly pick cells to move and directions
+            x0, y0 = self.rng.integers(0, n, size=(2, size))
+            direction = self.rng.integers(0, 4, size=size)
+            x1 = np.clip(x0 + DIRECTIONS_X[direction], 0, n - 1)
+            y1 = np.clip(y0 + DIRECTIONS_Y[direction], 0, n - 1)
+            for i0, i1 in zip((y0 * n + x0).tolist(), (y1 * n + x1).tolist()):
+                cells[i0], cells[i1] = cells[i1], cells[i0]
+        self.invalidate_cells()
+
+    def _load_cells(self, cells):
+        self._flat_cells = cells.ravel().tolist()
+
+    def _materialize_cells(self):
+        return np.array(self._flat_cells, dtype=float).reshape(self.n, self.n)
 
     def timesteps(self):
-        if self.initial_state is InitialStates.UPDOWN:
-            return 6000 * (self.n**2)
-        if self.initial_state is InitialStates.CIRCULAR:
-            return 6000 * (self.n**2)
+        return 6000 * (self.n**2)
@@ -1,41 +1,158 @@
 import numpy as np
-import random
+from enum import Enum
+from typing import Any, Optional, Union
+from scipy.fft import dctn, idctn
 
-from coffeematon.automatons.automaton import Automaton, InitialStates
+from coffeematon.automatons.automaton import Automaton
+
+# Number of steps above which the mean-field density is evolved spectrally
+SPECTRAL_MIN_STEPS = 8
+
+
+class Fluctuations(Enum):
+    POISSON = "poisson"
+    BINOMIAL = "binomial"
 
 
 class NonInteractingAutomaton(Automaton):
     NAME = "Non-Interacting"
+    # Expected number of particles of each cell in mean-field mode
+    density: np.ndarray
 
-    def __init__(self, *args, **kwargs):
+    def __init__(
+        self,
+        *args: Any,
+        mean_field: bool = False,
+        fluctuations: Optional[Union[Fluctuations, str]] = None,
+        **kwargs: Any,
+    ):
+        self.mean_field = mean_field
+        self.fluctuations = None
+        if fluctuations is not None:
+            self.fluctuations = Fluctuations(fluctuations)
         Automaton.__init__(self, *args, **kwargs)
         self.maxval = self.grainsize
+        if self.mean_field:
+            name = f"{self.NAME}-Mean-Field"
+            if self.fluctuations is not None:
+                name += f"-{self.fluctuations.value.capitalize()}"
+            self.parameters = (self.parameters[0], name, *self.parameters[2:])
+
+    def has_discrete_cells(self) -> bool:
+        # Fluctuations sample particle counts around the mean-field density
+        return not self.mean_field or self.fluctuations is not None
 
     def next(self):
-        new_cells = np.zeros((self.n, self.n))
-        for x0 in range(self.n):
-            for y0 in range(self.n):
-                for i in range(int(self.cells[y0][x0])):
-                    # Randomly pick a direction to move
-                    xd = 0
-                    yd = 0
-                    direction = random.randrange(0, 4)
-                    if direction == 0:
-                        xd = -1
-                    if direction == 1:
-                        xd = 1
-                    if direction == 2:
-                        yd = -1
-                    if direction == 3:
-                        yd = 1
-                    # Insert particle into new cell
-                    x1 = max(0, min(self.n - 1, x0 + xd))
-                    y1 = max(0, min(self.n - 1, y0 + yd))
-                    new_cells[y1][x1] += 1
-        self.cells = new_cells
+        self.advance(1)
+
+    def advance(self, k: int) -> None:
+        """Move every particle k times in a random direction.
+
+        In mean-field mode the expected density is evolved instead, with a
+        stencil for a few steps and spectrally for larger jumps.
+        """
+        if k == 0:
+            return
+        if self.mean_field:
+            if k <= SPECTRAL_MIN_STEPS:
+                for _ in range(k):
+                    self.density = mean_field_step(self.density)
+            else:
+                self.density = mean_field_steps(self.density, k)
+            self.invalidate_cells()
+            return
+
+        cells = self.cells.astype(np.int64)
+        for _ in range(k):
+            # Randomly split the particles of each cell among the four directions
+            left, right, up, down = np.moveaxis(
+                self.rng.multinomial(cells, [0.25] * 4), -1, 0
+            )
+            cells = move_particles(left, right, up, down)
+        self.cells = cells.astype(float)
+
+    def _load_cells(self, cells):
+        if self.mean_field:
+            self.density = np.array(cells, dtype=float)
+
+    def _materialize_cells(self):
+        """Observe the expected density, optionally with sampled particle noise."""
+        if self.fluctuations is Fluctuations.POISSON:
+            return self.rng.poisson(self.density).astype(float)
+        if self.fluctuations is Fluctuations.BINOMIAL:
+            # Independent walkers are multinomially distributed over the cells
+            n_particles = int(round(self.density.sum()))
+            probabilities = self.density.ravel() / self.density.sum()
+            counts = self.rng.multinomial(n_particles, probabilities)
+            return counts.reshape(self.density.shape).astype(float)
+        return self.density.copy()
+
+    def get_config(self):
+        config = super().get_config()
+        config.update(
+            {"mean_field": self.mean_field, "fluctuations": self.fluctuations}
+        )
+        return config
+
+    def get_checkpoint_state(self):
+        state = super().get_checkpoint_state()
+        if self.mean_field:
+            state["density"] = self.density.copy()
+        return state
+
+    def set_checkpoint_state(self, state):
+        super().set_checkpoint_state(state)
+        if self.mean_field:
+            self.density = state["density"].copy()
 
     def timesteps(self):
-        if self.initial_state is InitialStates.UPDOWN:
-            return 100 * self.n
-        if self.initial_state is InitialStates.CIRCULAR:
-            return 100 * self.n
+        return 100 * self.n
+
+
+def mean_field_step(density: np.ndarray) -> np.ndarray:
+    """Expected density of non-interacting particles after one step.
+
+    Each particle moves to one of its four neighbours with probability 1/4 and
+    particles moving into a wall stay in place, which edge padding reproduces.
+    """
+    padded = np.pad(density, 1, mode="edge")
+    return 0.25 * (
+        padded[1:-1, 2:] + padded[1:-1, :-2] + padded[2:, 1:-1] + padded[:-2, 1:-1]
+    )
+
+
+def mean_field_steps(density: np.ndarray, k: int) -> np.ndarray:
+    """Expected density of non-interacting particles after k steps.
+
+    The one step operator of mean_field_step is diagonal in the DCT-II basis
+    with eigenvalues (cos(pi a / h) + cos(pi b / w)) / 2, so k steps amount to
+    scaling the DCT coefficients by the k-th power of these eigenvalues.
+    Rounding errors of the round trip, which would leave slightly negative
+    densities where no particle can be, are clamped to 0.
+    """
+    height, width = density.shape
+    eigenvalues = 0.5 * (
+        np.cos(np.pi * np.arange(height) / height)[:, None]
+        + np.cos(np.pi * np.arange(width) / width)[None, :]
+    )
+    coefficients = dctn(density, norm="ortho") * eigenvalues**k
+    return np.maximum(idctn(coefficients, norm="ortho"), 0)
+
+
+def move_particles(
+    left: np.ndarray, right: np.ndarray, up: np.ndarray, down: np.ndarray
+) -> np.ndarray:
+    """Gather particles moving in each direction into their destination cells.
+
+    Particles moving into a wall stay in place.
+    """
+    moved = np.zeros_like(left)
+    moved[:, :-1] += left[:, 1:]
+    moved[:, 0] += left[:, 0]
+    moved[:, 1:] += right[:, :-1]
+    moved[:, -1] += right[:, -1]
+    moved[:-1] += up[1:]
+    moved[0] += up[0]
+    moved[1:] += down[:-1]
+    moved[-1] += down[-1]
+    return moved
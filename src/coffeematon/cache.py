@@ -0,0 +1,138 @@
+"""Content-addressed on-disk cache of experiment results."""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from functools import lru_cache
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_CACHE_DIR = Path("data", "cache")
+DEFAULT_MAX_SIZE = 1 << 30
+
+STATS_FILENAME = "stats.json"
+CSV_FILENAME = "results.csv"
+
+
+def package_version() -> str:
+    try:
+        return version("coffeematon")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+@lru_cache(maxsize=None)
+def source_hash() -> str:
+    """Hash the source files of the package.
+
+    Unlike the package version, this changes with the code of source checkouts
+    and editable installs.
+    """
+    package_dir = Path(__file__).parent
+    source = hashlib.sha256()
+    for source_path in sorted(package_dir.glob("**/*.py")):
+        source.update(str(source_path.relative_to(package_dir)).encode())
+        source.update(source_path.read_bytes())
+    return source.hexdigest()
+
+
+def config_key(config: Dict[str, Any]) -> str:
+    """Hash a run configuration, together with the package code, into a key."""
+    keyed_config = dict(config, version=package_version(), source=source_hash())
+    serialized = json.dumps(keyed_config, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode()).hexdigest()
+
+
+class ResultCache:
+    """Cache of run statistics and csv results keyed by their full configuration.
+
+    Each entry is a directory named after the configuration key holding the
+    statistics and, if any, the csv results of the run. When the cache exceeds
+    max_size bytes, the least recently used entries are evicted.
+    """
+
+    def __init__(
+        self, cache_dir: Path = DEFAULT_CACHE_DIR, max_size: int = DEFAULT_MAX_SIZE
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_size = max_size
+
+    def entry_dir(self, config: Dict[str, Any]) -> Path:
+        return self.cache_dir / config_key(config)
+
+    def get(self, config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return the cached statistics of the configuration, None if not cached.
+
+        The returned dictionary also holds the path to the cached csv results
+        under "csv_path", None if the run did not save any.
+        """
+        entry_dir = self.entry_dir(config)
+        stats_path = entry_dir / STATS_FILENAME
+        if not stats_path.exists():
+            return None
+        with open(stats_path, "r") as stats_file:
+            entry = json.load(stats_file)
+        # Mark the entry as recently used for eviction
+        os.utime(entry_dir)
+        csv_path = entry_dir / CSV_FILENAME
+        entry["csv_path"] = csv_path if csv_path.exists() else None
+        return entry
+
+    def put(
+        self,
+        config: Dict[str, Any],
+        stats: Dict[str, Any],
+        csv_path: Optional[Path] = None,
+    ) -> None:
+        """Atomically store the statistics and csv results of a configuration.
+
+        Concurrent writers of the same configuration each write their own
+        temporary directory, and the first entry stored is kept unless it lacks
+        the csv results given here.
+        """
+        entry_dir = self.entry_dir(config)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(suffix=".tmp", dir=self.cache_dir))
+        with open(tmp_dir / STATS_FILENAME, "w") as stats_file:
+            json.dump({"config": config, "stats": stats}, stats_file, default=str)
+        if csv_path is not None:
+            shutil.copyfile(csv_path, tmp_dir / CSV_FILENAME)
+        if csv_path is not None and not (entry_dir / CSV_FILENAME).exists():
+            # Move the entry without csv results aside so that it can be replaced
+            stale_dir = Path(tempfile.mkdtemp(suffix=".tmp", dir=self.cache_dir))
+            try:
+                os.replace(entry_dir, stale_dir)
+            except FileNotFoundError:
+                pass
+            shutil.rmtree(stale_dir)
+        try:
+            os.replace(tmp_dir, entry_dir)
+        except OSError:
+            if not entry_dir.exists():
+                raise
+            # Another writer stored the configuration first
+            shutil.rmtree(tmp_dir)
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_size."""
+        if not self.cache_dir.exists():
+            return
+        entries = [
+            (entry_dir.stat().st_mtime, _dir_size(entry_dir), entry_dir)
+            for entry_dir in self.cache_dir.iterdir()
+            if entry_dir.is_dir() and not entry_dir.name.endswith(".tmp")
+        ]
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry_dir in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            shutil.rmtree(entry_dir)
+            total_size -= size
+
+
+def _dir_size(path: Path) -> int:
+    return sum(file_path.stat().st_size for file_path in path.glob("**/*"))
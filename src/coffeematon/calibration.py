@@ -0,0 +1,80 @@
+"""Calibration of the analytic complexity estimators against gzip sizes."""
+
+import argparse
+from csv import DictReader
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+from scipy.stats import spearmanr
+
+from coffeematon.automatons.automaton import ESTIMATORS
+
+
+def read_results(csv_results_path: Path) -> Dict[str, List[int]]:
+    results_data: Dict[str, List[int]] = {}
+    with open(csv_results_path, "r") as csv_results_file:
+        results = DictReader(csv_results_file)
+        for field in results.fieldnames or []:
+            results_data[field] = []
+        for results_dict in results:
+            for field, value in results_dict.items():
+                results_data[field].append(int(value))
+    return results_data
+
+
+def calibration_report(csv_results_path: Path) -> Dict[str, Dict[str, Any]]:
+    """Correlate each analytic estimator with the gzip size of its source array.
+
+    Returns, for each estimator column of the results file, the gzip column it
+    estimates with the Pearson and Spearman correlations between the two and
+    the mean ratio of estimated to gzip size.
+    """
+    results_data = read_results(Path(csv_results_path))
+    report = {}
+    for c_type, (source_type, _) in ESTIMATORS.items():
+        column = c_type.value.capitalize()
+        source_column = source_type.value.capitalize()
+        if column not in results_data or source_column not in results_data:
+            continue
+        estimated = np.array(results_data[column], dtype=float)
+        zipped = np.array(results_data[source_column], dtype=float)
+        report[column] = {
+            "gzip": source_column,
+            "pearson": _pearson(estimated, zipped),
+            "spearman": _spearman(estimated, zipped),
+            "ratio": float(np.mean(estimated / np.maximum(zipped, 1))),
+        }
+    return report
+
+
+def _pearson(x: np.ndarray, y: np.ndarray) -> float:
+    if len(x) < 2 or np.std(x) == 0 or np.std(y) == 0:
+        return float("nan")
+    return float(np.corrcoef(x, y)[0, 1])
+
+
+def _spearman(x: np.ndarray, y: np.ndarray) -> float:
+    if len(x) < 2 or np.std(x) == 0 or np.std(y) == 0:
+        return float("nan")
+    return float(spearmanr(x, y)[0])
+
+
+def print_report(report: Dict[str, Dict[str, Any]]) -> None:
+    header = (
+        f"{'Estimator':<16}{'Gzip':<12}{'Pearson':>10}{'Spearman':>10}{'Ratio':>10}"
+    )
+    print(header)
+    print("-" * len(header))
+    for column, stats in report.items():
+        print(
+            f"{column:<16}{stats['gzip']:<12}"
+            f"{stats['pearson']:>10.3f}{stats['spearman']:>10.3f}{stats['ratio']:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("csv_path", help="Path to the csv results file.")
+    args = parser.parse_args()
+    print_report(calibration_report(args.csv_path))
@@ -3,22 +3,212 @@
 
 import gzip
 import bz2
+import hashlib
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
-from typing import Union
+from itertools import repeat
+from typing import Dict, Hashable, Optional, Tuple, Union
 import numpy as np
+from scipy.special import gammaln
 
 save_images = True
 
+MAX_UINT8 = 255
+# Compression level of gzip.compress
+GZIP_LEVEL = 9
+# Cells of the causal neighbourhood of conditional_entropy, with the cell itself
+CONTEXT_CELLS = 5
+# Largest number of bits of the packed neighbourhood codes counted densely
+MAX_PACKED_BITS = 20
+# Number of bytes back zlib matches can reach, preset dictionaries included
+ZLIB_WINDOW = 32 * 1024
+
 
 class Compression(Enum):
     BZIP = "bzip"
     GZIP = "gzip"
 
 
+class Serialization(Enum):
+    RAW = "raw"
+    CATEGORIES = "categories"
+    LEVELS = "levels"
+    BITS = "bits"
+    DIFF = "diff"
+    DIFF_GRID = "diff_grid"
+
+
 def zip_array(
-    array: np.ndarray, compression: Union[Compression, str] = Compression.GZIP
+    array: np.ndarray,
+    compression: Union[Compression, str] = Compression.GZIP,
+    serialization: Union[Serialization, str] = Serialization.RAW,
+    bin_size: Optional[float] = None,
 ) -> int:
-    return zip_bytes(array.tobytes(), compression)
+    return zip_bytes(serialize_array(array, serialization, bin_size), compression)
+
+
+def serialize_array(
+    array: np.ndarray,
+    serialization: Union[Serialization, str] = Serialization.RAW,
+    bin_size: Optional[float] = None,
+) -> bytes:
+    """Serialize the array to bytes before compression.
+
+    - RAW: the in-memory bytes of the array.
+    - CATEGORIES: one uint8 category index per cell (see category_indices), or
+        RAW if the array has more than 256 distinct values.
+    - LEVELS: one uint8 level index per cell of an array of multiples of
+        bin_size, such as a coarse-grained array, or CATEGORIES if the levels
+        do not fit in a byte.
+    - BITS: one bit per cell of a boolean array.
+    - DIFF: BITS of the cells equal to 0.5 (identical to the coarse-grained
+        array), followed by CATEGORIES of the other cells.
+    - DIFF_GRID: one uint8 per cell of the whole grid, 0 for the cells equal to
+        0.5 and 1 + CATEGORIES for the other cells, or RAW if they do not fit
+        in a byte. Unlike DIFF, its length does not depend on the number of
+        identical cells.
+    """
+    serialization = Serialization(serialization)
+    if serialization is Serialization.CATEGORIES:
+        return _categories_bytes(array)
+    if serialization is Serialization.LEVELS:
+        levels = None if bin_size is None else level_indices(array, bin_size)
+        if levels is None:
+            return _categories_bytes(array)
+        return levels.tobytes()
+    if serialization is Serialization.BITS:
+        return np.packbits(array.astype(bool), axis=None).tobytes()
+    if serialization is Serialization.DIFF:
+        mask = array == 0.5
+        return np.packbits(mask, axis=None).tobytes() + _categories_bytes(array[~mask])
+    if serialization is Serialization.DIFF_GRID:
+        mask = array == 0.5
+        indices = category_indices(np.where(mask, 0.0, array))
+        if indices.dtype.itemsize > 1 or (indices.size and indices.max() == MAX_UINT8):
+            return array.tobytes()
+        return np.where(mask, 0, indices + 1).astype(np.uint8).tobytes()
+    return array.tobytes()
+
+
+def _categories_bytes(array: np.ndarray) -> bytes:
+    indices = category_indices(array)
+    if indices.dtype.itemsize > 1:
+        return array.tobytes()
+    return indices.tobytes()
+
+
+class TiledZipper:
+    """Estimate the compressed size of arrays as the sum of the sizes of their tiles.
+
+    Arrays are split into tile_size x tile_size tiles that are compressed
+    independently in a thread pool. The compressed size of each tile is cached by
+    the hash of its content so identical tiles, such as uniform regions or regions
+    unchanged since the last snapshot, are only compressed once.
+    """
+
+    def __init__(
+        self,
+        tile_size: int = 32,
+        compression: Union[Compression, str] = Compression.GZIP,
+        max_workers: Optional[int] = None,
+        max_cache_size: int = 1_000_000,
+    ):
+        self.tile_size = tile_size
+        self.compression = Compression(compression)
+        self.max_workers = max_workers
+        self.max_cache_size = max_cache_size
+        self.cache: Dict[bytes, int] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def zip_array(
+        self,
+        array: np.ndarray,
+        serialization: Union[Serialization, str] = Serialization.RAW,
+        bin_size: Optional[float] = None,
+    ) -> int:
+        tiles = [
+            serialize_array(
+                np.ascontiguousarray(
+                    array[i : i + self.tile_size, j : j + self.tile_size]
+                ),
+                serialization,
+                bin_size,
+            )
+            for i in range(0, array.shape[0], self.tile_size)
+            for j in range(0, array.shape[1], self.tile_size)
+        ]
+        keys = [hashlib.blake2b(tile, digest_size=16).digest() for tile in tiles]
+
+        known = {key: self.cache[key] for key in keys if key in self.cache}
+        missing = {key: tile for key, tile in zip(keys, tiles) if key not in known}
+        if missing:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers)
+            sizes = self._executor.map(
+                zip_bytes, missing.values(), repeat(self.compression)
+            )
+            known.update(zip(missing.keys(), sizes))
+            if len(self.cache) + len(missing) > self.max_cache_size:
+                self.cache.clear()
+            self.cache.update((key, known[key]) for key in missing)
+        return sum(known[key] for key in keys)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+class DeltaZipper:
+    """Estimate the compressed size of arrays given the previous array of their kind.
+
+    An array is coded as the cheapest of its standalone compression, the
+    compression of the bits of the bytes changed since the previous serialized
+    array given for the same key followed by their new values, and for GZIP its
+    compression with the previous array as preset dictionary, which zlib only
+    reaches back ZLIB_WINDOW bytes into. One byte records which coding is used,
+    so an array never costs more than one byte over its standalone size. This
+    needs serializations of fixed length mapping a value to the same bytes at
+    every snapshot, such as LEVELS or DIFF_GRID. The first array of a key, or
+    one whose serialized size changed, is compressed alone.
+    """
+
+    # Largest fraction of changed bytes coded as a delta
+    max_changed = 0.05
+
+    def __init__(self, compression: Union[Compression, str] = Compression.GZIP):
+        self.compression = Compression(compression)
+        self.previous: Dict[Hashable, bytes] = {}
+
+    def zip_array(
+        self,
+        key: Hashable,
+        array: np.ndarray,
+        serialization: Union[Serialization, str] = Serialization.RAW,
+        bin_size: Optional[float] = None,
+    ) -> int:
+        serialized = serialize_array(array, serialization, bin_size)
+        previous = self.previous.get(key)
+        self.previous[key] = serialized
+        standalone = zip_bytes(serialized, self.compression)
+        if previous is None or len(previous) != len(serialized):
+            return standalone
+        sizes = [standalone]
+        current = np.frombuffer(serialized, dtype=np.uint8)
+        changed = current != np.frombuffer(previous, dtype=np.uint8)
+        if changed.mean() <= self.max_changed:
+            delta = (
+                np.packbits(changed, axis=None).tobytes() + current[changed].tobytes()
+            )
+            sizes.append(zip_bytes(delta, self.compression))
+        if self.compression is Compression.GZIP and len(previous) <= ZLIB_WINDOW:
+            compressor = zlib.compressobj(GZIP_LEVEL, zdict=previous)
+            sizes.append(len(compressor.compress(serialized) + compressor.flush()))
+        return 1 + min(sizes)
+
+    def reset(self):
+        self.previous = {}
 
 
 def zip_string(
@@ -35,5 +225,170 @@ def zip_bytes(bytes: bytes, compression: Union[Compression, str]) -> int:
         return len(bz2.compress(bytes))
 
 
+def level_indices(array: np.ndarray, bin_size: float) -> Optional[np.ndarray]:
+    """Map an array of multiples of bin_size to uint8 level indices.
+
+    Coarse-grained arrays are multiples of a bin size at least the nominal
+    bin_size, so rounding maps distinct levels to distinct indices and a level
+    always has the same index. Returns None if the levels do not fit in a byte.
+    """
+    levels = np.rint(array / bin_size)
+    if levels.size and (levels.min() < 0 or levels.max() > MAX_UINT8):
+        return None
+    return levels.astype(np.uint8)
+
+
+def category_indices(array: np.ndarray) -> np.ndarray:
+    """Map the values of the array to non-negative integer categories.
+
+    Arrays of integers fitting in a byte, such as particle grids, are their own
+    uint8 categories. Other arrays fall back to the rank of each value among
+    the distinct values, in the smallest unsigned dtype able to hold the number
+    of categories.
+    """
+    if array.dtype == bool:
+        return array.astype(np.uint8)
+    if np.issubdtype(array.dtype, np.integer):
+        if array.size == 0 or (array.min() >= 0 and array.max() <= MAX_UINT8):
+            return array.astype(np.uint8)
+    rounded = np.rint(array)
+    if (
+        rounded.size
+        and rounded.min() >= 0
+        and rounded.max() <= MAX_UINT8
+        and np.array_equal(rounded, array)
+    ):
+        return rounded.astype(np.uint8)
+    _, indices = np.unique(array.ravel(), return_inverse=True)
+    dtype = np.min_scalar_type(max(int(indices.max(initial=0)), 0))
+    return indices.reshape(array.shape).astype(dtype)
+
+
+def run_length_entropy(array: np.ndarray) -> int:
+    """Estimate the encoded size in bytes of the array from its run-length entropy.
+
+    The array is read in row-major order as category indices and split into runs
+    of identical categories. The estimate is the number of runs times the
+    empirical entropy of the (category, run length) symbols.
+    """
+    indices = category_indices(array).ravel()
+    if indices.size == 0:
+        return 0
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(indices)) + 1))
+    lengths = np.diff(np.append(starts, indices.size))
+    symbols = indices[starts].astype(np.int64) * (indices.size + 1) + lengths
+    return _entropy_size(symbols)
+
+
+def conditional_entropy(array: np.ndarray) -> int:
+    """Estimate the encoded size in bytes of the array from its local patterns.
+
+    Each cell is predicted from its causal neighbourhood (west, north, north-west
+    and north-east cells, out-of-grid neighbours forming their own category).
+    The estimate is the code length of an adaptive coder using one
+    Krichevsky-Trofimov estimator per neighbourhood, so each new neighbourhood
+    pays to learn its cells instead of looking perfectly predictable as with
+    the empirical conditional entropy.
+    """
+    if array.size == 0:
+        return 0
+    indices = category_indices(array)
+    # Cell codes are shifted by one so that 0 codes out-of-grid neighbours
+    code_bits = (int(indices.max()) + 1).bit_length()
+    if CONTEXT_CELLS * code_bits <= MAX_PACKED_BITS:
+        context_counts, joint_counts, n_symbols = _packed_context_counts(
+            indices, code_bits
+        )
+    else:
+        context_counts, joint_counts, n_symbols = _sparse_context_counts(indices)
+    half = n_symbols / 2
+    nats = np.sum(gammaln(context_counts + half) - gammaln(half)) - np.sum(
+        gammaln(joint_counts + 0.5) - gammaln(0.5)
+    )
+    bits = nats / np.log(2)
+    return int(np.ceil(max(bits, 0.0) / 8))
+
+
+def _context_views(padded: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """West, north, north-west and north-east neighbours then the cells themselves.
+
+    The padded array has one more row on top and one more column on each side.
+    """
+    return (
+        padded[1:, :-2],
+        padded[:-1, 1:-1],
+        padded[:-1, :-2],
+        padded[:-1, 2:],
+        padded[1:, 1:-1],
+    )
+
+
+def _packed_context_counts(
+    indices: np.ndarray, bits: int
+) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Counts of the contexts and of the (context, cell) pairs, and number of symbols.
+
+    The codes of the four neighbours and of the cell are packed in the bits of a
+    single code, so one bincount counts every pair and summing the pairs sharing
+    their neighbour bits gives the context counts.
+    """
+    height, width = indices.shape
+    dtype = np.uint16 if CONTEXT_CELLS * bits <= 16 else np.uint32
+    padded = np.zeros((height + 1, width + 2), dtype=dtype)
+    padded[1:, 1:-1] = indices
+    padded[1:, 1:-1] += 1
+    west, *others = _context_views(padded)
+    joint = west.copy()
+    for other in others:
+        joint <<= bits
+        joint |= other
+    counts = np.bincount(joint.ravel())
+    codes = np.flatnonzero(counts)
+    joint_counts = counts[codes]
+    context_counts = np.bincount(codes >> bits, weights=joint_counts)
+    n_symbols = np.count_nonzero(np.bincount(codes & ((1 << bits) - 1)))
+    return context_counts[context_counts > 0], joint_counts, int(n_symbols)
+
+
+def _sparse_context_counts(indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Counts of _packed_context_counts for alphabets too large to pack."""
+    padded = np.pad(indices.astype(np.int64) + 1, ((1, 0), (1, 1)))
+    *neighbours, cells = (view.ravel() for view in _context_views(padded))
+    context = np.zeros(indices.size, dtype=np.int64)
+    for neighbour in neighbours:
+        context = _combine_codes(context, neighbour)
+    joint = _combine_codes(context, cells)
+    return _counts(context), _counts(joint), len(_counts(cells))
+
+
+def _combine_codes(codes: np.ndarray, symbols: np.ndarray) -> np.ndarray:
+    """Encode pairs of (code, symbol) into a single dense code."""
+    combined = codes * (int(symbols.max()) + 1) + symbols
+    if combined.max() < combined.size:
+        return combined
+    _, dense = np.unique(combined, return_inverse=True)
+    return dense.ravel()
+
+
+def _counts(codes: np.ndarray) -> np.ndarray:
+    """Number of occurrences of each distinct non-negative integer code."""
+    if codes.max() < 4 * codes.size:
+        counts = np.bincount(codes)
+        return counts[counts > 0]
+    _, counts = np.unique(codes, return_counts=True)
+    return counts
+
+
+def _entropy(codes: np.ndarray) -> float:
+    """Empirical entropy in bits per symbol of non-negative integer codes."""
+    counts = _counts(codes)
+    probabilities = counts / codes.size
+    return float(-np.sum(probabilities * np.log2(probabilities)))
+
+
+def _entropy_size(codes: np.ndarray) -> int:
+    return int(np.ceil(codes.size * _entropy(codes) / 8))
+
+
 def write_string(array):
     return " ".join([" ".join([str(x) for x in row]) for row in array])
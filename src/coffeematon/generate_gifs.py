@@ -1,12 +1,88 @@
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, List, Optional, Tuple
 
-import imageio.v2 as imageio
 import argparse
+import numpy as np
+from PIL import GifImagePlugin, Image
 
 
-def generate_gif(path: Path, gif_path: Optional[Path] = None):
+class GifWriter:
+    """Animated gif encoded frame by frame as frames are appended.
+
+    Only one frame out of every is kept and frames larger than max_size pixels
+    are downscaled. The gif is written to a temporary file and moved to
+    gif_path when the writer is closed.
+    """
+
+    def __init__(self, gif_path: Path, every: int = 1, max_size: Optional[int] = None):
+        self.gif_path = Path(gif_path)
+        self.every = every
+        self.max_size = max_size
+        self.n_appended = 0
+        self.n_frames = 0
+        self.tmp_path = self.gif_path.with_name(self.gif_path.name + ".tmp")
+        self.file = open(self.tmp_path, "wb")
+
+    def append(self, frame: np.ndarray) -> None:
+        """Append a frame of 8-bit gray levels."""
+        self.n_appended += 1
+        if (self.n_appended - 1) % self.every:
+            return
+        image = Image.fromarray(np.ascontiguousarray(frame, dtype=np.uint8), "L")
+        if self.max_size is not None and max(image.size) > self.max_size:
+            scale = self.max_size / max(image.size)
+            size = (
+                max(round(image.width * scale), 1),
+                max(round(image.height * scale), 1),
+            )
+            image = image.resize(size, Image.Resampling.BOX)
+        if self.n_frames == 0:
+            header, _ = GifImagePlugin.getheader(image, info={"loop": 0})
+            self.file.write(b"".join(header))
+        self.file.write(b"".join(GifImagePlugin.getdata(image)))
+        self.n_frames += 1
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.file.write(b";")
+        self.file.close()
+        if self.n_frames == 0:
+            os.remove(self.tmp_path)
+            return
+        os.replace(self.tmp_path, self.gif_path)
+
+    def abort(self):
+        """Discard the partially written gif."""
+        if self.file.closed:
+            return
+        self.file.close()
+        os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def array_to_frame(array: np.ndarray) -> np.ndarray:
+    """Convert an array of values in [0, 1] to gray levels, as saved in bitmaps."""
+    return np.clip(np.asarray(array, dtype=float) * 255, 0, 255).astype(np.uint8)
+
+
+def generate_gif(
+    path: Path,
+    gif_path: Optional[Path] = None,
+    every: int = 1,
+    max_size: Optional[int] = None,
+) -> Path:
     path = Path(path)
     if gif_path is None:
         gif_path = path.parent / f"{path.name}_bitmaps.gif"
@@ -17,20 +93,62 @@ def generate_gif(path: Path, gif_path: Optional[Path] = None):
         if filename.endswith(".bmp")
     ]
     bitmaps_steps.sort()
-    with imageio.get_writer(gif_path, mode="I", loop=0) as writer:
+    with GifWriter(gif_path, every, max_size) as writer:
         for step in bitmaps_steps:
-            image = imageio.imread(path / f"{step}.bmp")
-            writer.append_data(image)
+            with Image.open(path / f"{step}.bmp") as image:
+                writer.append(np.asarray(image.convert("L")))
 
     return gif_path
 
 
+def generate_gifs(
+    paths: Iterable[Tuple[Path, Optional[Path]]],
+    every: int = 1,
+    max_size: Optional[int] = None,
+    max_workers: Optional[int] = None,
+) -> List[Path]:
+    """Generate the gifs of several bitmaps folders in parallel processes.
+
+    paths holds pairs of bitmaps folder and gif path, as given to generate_gif.
+    Daemonic processes, such as the workers of a multiprocessing pool, cannot
+    start processes and generate the gifs one after the other.
+    """
+    paths = list(paths)
+    if not paths:
+        return []
+    if multiprocessing.current_process().daemon:
+        return [
+            generate_gif(path, gif_path, every, max_size) for path, gif_path in paths
+        ]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(generate_gif, path, gif_path, every, max_size)
+            for path, gif_path in paths
+        ]
+        return [future.result() for future in futures]
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "path",
-        help="Path to the bitmaps folder. Gif will be generated alongside.",
+        help="Paths to bitmaps folders. Gifs will be generated alongside.",
+        nargs="+",
+    )
+    parser.add_argument(
+        "--every",
+        help="Keep one frame out of every.",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--max-size",
+        help="Downscale frames larger than this number of pixels.",
+        type=int,
     )
     args = parser.parse_args()
-    saved_path = generate_gif(args.path)
-    print(f"Successfuly saved gif at {saved_path}")
+    saved_paths = generate_gifs(
+        [(path, None) for path in args.path], args.every, args.max_size
+    )
+    for saved_path in saved_paths:
+        print(f"Successfuly saved gif at {saved_path}")
@@ -0,0 +1,77 @@
+"""Vectorized generators of the masks of initially filled cells.
+
+Masks are indexed by row then column, like the automaton cells, and cached
+per set of parameters. Cached masks are read-only, copy them before writing.
+"""
+
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+
+# Number of cached masks of each shape
+CACHE_SIZE = 16
+
+
+def _read_only(mask: np.ndarray) -> np.ndarray:
+    mask.setflags(write=False)
+    return mask
+
+
+def _grid(n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Row and column indices broadcasting to an n x n grid."""
+    x, y = np.ogrid[:n, :n]
+    return x, y
+
+
+def _discs(n: int, centers: np.ndarray, radii: np.ndarray) -> np.ndarray:
+    x, y = _grid(n)
+    mask = np.zeros((n, n), dtype=bool)
+    for (center_x, center_y), radius in zip(centers, radii):
+        mask |= np.sqrt((x - center_x) ** 2 + (y - center_y) ** 2) < radius
+    return mask
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def updown_mask(n: int) -> np.ndarray:
+    """Upper half of the grid."""
+    mask = np.zeros((n, n), dtype=bool)
+    mask[: n // 2] = True
+    return _read_only(mask)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def circular_mask(n: int) -> np.ndarray:
+    """Centered drop with a radius of a quarter of the grid."""
+    return _read_only(_discs(n, np.array([(n / 2, n / 2)]), np.array([n / 4])))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def drops_mask(n: int, n_drops: int) -> np.ndarray:
+    """Row of n_drops evenly spaced drops across the middle of the grid.
+
+    A single drop is the circular mask.
+    """
+    centers = np.array([(n / 2, (i + 0.5) * n / n_drops) for i in range(n_drops)])
+    radii = np.full(n_drops, n / (4 * n_drops))
+    return _read_only(_discs(n, centers, radii))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def stripes_mask(n: int, n_stripes: int) -> np.ndarray:
+    """n_stripes horizontal stripes alternating with empty stripes of equal height.
+
+    A single stripe is the updown mask for even n.
+    """
+    x, _ = _grid(n)
+    stripes = (2 * n_stripes * x // n) % 2 == 0
+    return _read_only(np.broadcast_to(stripes, (n, n)).copy())
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def blobs_mask(n: int, n_blobs: int, seed: int) -> np.ndarray:
+    """n_blobs drops of random centers and radii drawn with the given seed."""
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(0, n, size=(n_blobs, 2))
+    radii = rng.uniform(n / 10, n / 5, size=n_blobs)
+    return _read_only(_discs(n, centers, radii))
@@ -0,0 +1,281 @@
+"""Estimate the cost of experiments before launching them."""
+
+import argparse
+import math
+import tempfile
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from coffeematon.automatons.automaton import (
+    Automaton,
+    ArrayTypes,
+    InitialStates,
+    source_type,
+)
+from coffeematon.generate_gifs import GifWriter, array_to_frame
+
+# Minimum duration of the timed advance when micro-benchmarking steps
+MIN_BENCHMARK_TIME = 0.5
+# Size of the header of the 8-bit bitmaps saved at each snapshot
+BMP_HEADER_SIZE = 1078
+# Size of a recorded complexity or step: a Python int and its pointer in a list
+RESULT_SIZE = 36
+
+
+@dataclass
+class Benchmark:
+    """Costs of an automaton of size n measured on the local machine.
+
+    gif_time is the time to encode the gif frames of one snapshot and
+    peak_memory the peak memory from building the automaton to its first
+    snapshot, measured in a separate untimed pass.
+    """
+
+    n: int
+    step_time: float
+    snapshot_time: float
+    gif_time: float
+    peak_memory: int
+
+
+@dataclass
+class Plan:
+    """Estimated cost of a single run.
+
+    peak_memory covers the automaton, the measure of a snapshot and the results
+    recorded over the whole run.
+    """
+
+    n: int
+    n_steps: int
+    n_snapshots: int
+    wall_time: float
+    disk_usage: int
+    peak_memory: int
+
+
+def benchmark(
+    automaton_type: str,
+    n: int,
+    init: Optional[InitialStates] = None,
+    max_save_steps: int = 1000,
+    gif_max_size: Optional[int] = None,
+    **automaton_kwargs: Any,
+) -> Benchmark:
+    """Micro-benchmark the steps and one snapshot of an automaton of size n."""
+    from coffeematon.__main__ import AUTOMATONS
+
+    automaton: Automaton = AUTOMATONS[automaton_type](
+        n, init, save=False, **automaton_kwargs
+    )
+    automaton.start()
+    save_stepsize = max(automaton.esttime // max_save_steps, 1)
+
+    # Time advances of doubling size, up to one snapshot interval
+    k, elapsed = 1, 0.0
+    while True:
+        t_start = perf_counter()
+        automaton.advance(k)
+        elapsed = perf_counter() - t_start
+        if elapsed >= MIN_BENCHMARK_TIME or k >= save_stepsize:
+            break
+        k = min(2 * k, save_stepsize)
+    step_time = elapsed / k
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        t_start = perf_counter()
+        c_type_to_arr = automaton.compute_arrays()
+        automaton.compute_complexities(c_type_to_arr)
+        automaton.save_images(Path(tmp_dir), 0, c_type_to_arr)
+        snapshot_time = perf_counter() - t_start
+
+        t_start = perf_counter()
+        _append_gif_frames(c_type_to_arr, Path(tmp_dir), gif_max_size)
+        gif_time = perf_counter() - t_start
+
+    # Tracing allocations slows everything down, so memory is measured apart
+    tracemalloc.start()
+    try:
+        automaton = AUTOMATONS[automaton_type](n, init, save=False, **automaton_kwargs)
+        automaton.start()
+        automaton.advance(1)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            c_type_to_arr = automaton.compute_arrays()
+            automaton.compute_complexities(c_type_to_arr)
+            automaton.save_images(Path(tmp_dir), 0, c_type_to_arr)
+            _append_gif_frames(c_type_to_arr, Path(tmp_dir), gif_max_size)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return Benchmark(n, step_time, snapshot_time, gif_time, peak_memory)
+
+
+def _append_gif_frames(
+    c_type_to_arr: Dict[ArrayTypes, np.ndarray],
+    gifs_dir: Path,
+    max_size: Optional[int],
+) -> None:
+    """Encode one gif frame of each array type saved as images."""
+    for c_type, arr in c_type_to_arr.items():
+        with GifWriter(gifs_dir / f"{c_type.value}.gif", max_size=max_size) as writer:
+            writer.append(array_to_frame(arr))
+
+
+def plan_runs(
+    automaton_type: str,
+    ns: Sequence[int],
+    init: Optional[InitialStates] = None,
+    max_save_steps: int = 1000,
+    gif_every: int = 1,
+    gif_max_size: Optional[int] = None,
+    **automaton_kwargs: Any,
+) -> List[Plan]:
+    """Estimate the cost of a run for each size in ns.
+
+    The smallest and largest sizes are benchmarked and the per step and per
+    snapshot costs of the other sizes are interpolated with a power law of n.
+    The number of steps of each run is given by the automaton timesteps.
+    automaton_kwargs are given to the automata, as by parse_experiment_args.
+    """
+    from coffeematon.__main__ import AUTOMATONS
+
+    ns = sorted(ns)
+    benchmarks = [
+        benchmark(
+            automaton_type, n, init, max_save_steps, gif_max_size, **automaton_kwargs
+        )
+        for n in sorted({ns[0], ns[-1]})
+    ]
+
+    plans = []
+    for n in ns:
+        automaton: Automaton = AUTOMATONS[automaton_type](
+            n, init, save=False, **automaton_kwargs
+        )
+        n_steps = automaton.esttime
+        save_stepsize = max(n_steps // max_save_steps, 1)
+        n_snapshots = len(range(0, n_steps, save_stepsize))
+        n_frames = math.ceil(n_snapshots / gif_every)
+        n_images = sum(
+            source_type(c_type) is c_type for c_type in automaton.complexities
+        )
+        n_results = len(automaton.complexities) + 1
+        step_time = _interpolate(benchmarks, n, "step_time")
+        snapshot_time = _interpolate(benchmarks, n, "snapshot_time")
+        gif_time = _interpolate(benchmarks, n, "gif_time")
+
+        # Bitmaps have 4-byte aligned rows, gifs are bounded by one byte per pixel
+        bitmap_size = BMP_HEADER_SIZE + n * (4 * math.ceil(n / 4))
+        frame_side = n if gif_max_size is None else min(n, gif_max_size)
+        csv_size = n_snapshots * 12 * n_results
+        disk_usage = (
+            n_images * (n_snapshots * bitmap_size + n_frames * frame_side**2) + csv_size
+        )
+        plans.append(
+            Plan(
+                n=n,
+                n_steps=n_steps,
+                n_snapshots=n_snapshots,
+                wall_time=n_steps * step_time
+                + n_snapshots * snapshot_time
+                + n_frames * gif_time,
+                disk_usage=disk_usage,
+                peak_memory=int(_interpolate(benchmarks, n, "peak_memory"))
+                + n_snapshots * n_results * RESULT_SIZE,
+            )
+        )
+    return plans
+
+
+def _interpolate(benchmarks: List[Benchmark], n: int, attribute: str) -> float:
+    """Interpolate a benchmarked cost at size n with a power law of n."""
+    first, last = benchmarks[0], benchmarks[-1]
+    first_value, last_value = getattr(first, attribute), getattr(last, attribute)
+    if first.n == last.n or first_value <= 0 or last_value <= 0:
+        return max(first_value, last_value)
+    exponent = math.log(last_value / first_value) / math.log(last.n / first.n)
+    return first_value * (n / first.n) ** exponent
+
+
+def format_duration(seconds: float) -> str:
+    for unit, unit_seconds in (("d", 86400), ("h", 3600), ("min", 60)):
+        if seconds >= unit_seconds:
+            return f"{seconds / unit_seconds:.1f} {unit}"
+    return f"{seconds:.1f} s"
+
+
+def format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def print_plans(plans: List[Plan]) -> None:
+    header = (
+        f"{'n':>6}{'Steps':>14}{'Snapshots':>11}"
+        f"{'Wall time':>12}{'Disk (max)':>12}{'Peak memory':>13}"
+    )
+    print(header)
+    print("-" * len(header))
+    for plan in plans:
+        print(
+            f"{plan.n:>6}{plan.n_steps:>14,}{plan.n_snapshots:>11}"
+            f"{format_duration(plan.wall_time):>12}"
+            f"{format_bytes(plan.disk_usage):>12}"
+            f"{format_bytes(plan.peak_memory):>13}"
+        )
+    if len(plans) > 1:
+        print("-" * len(header))
+        print(
+            f"{'Total':>31}"
+            f"{format_duration(sum(plan.wall_time for plan in plans)):>12}"
+            f"{format_bytes(sum(plan.disk_usage for plan in plans)):>12}"
+            f"{format_bytes(max(plan.peak_memory for plan in plans)):>13}"
+        )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    from coffeematon.__main__ import experiment_kwargs_from_args, experiment_parser
+
+    parser = experiment_parser(
+        size=False,
+        prog="coffeematon plan",
+        description="Estimate wall time, disk usage and memory of experiments, "
+        "given the arguments of the experiments.",
+    )
+    sizes = parser.add_mutually_exclusive_group(required=True)
+    sizes.add_argument("-n", help="Size of the automaton.", type=int)
+    sizes.add_argument(
+        "--range",
+        help="Range of sizes of the automaton, as for data_for_range.",
+        type=int,
+        nargs=3,
+        metavar=("START", "STOP", "STEP"),
+    )
+    parser.add_argument(
+        "--max-save-steps",
+        help="Maximum number of snapshots of each run.",
+        type=int,
+        default=1000,
+    )
+    args = parser.parse_args(argv)
+    experiment_kwargs, automaton_kwargs = experiment_kwargs_from_args(parser, args)
+    ns = [args.n] if args.n is not None else list(range(*args.range))
+    plans = plan_runs(
+        args.automaton,
+        ns,
+        args.init,
+        args.max_save_steps,
+        experiment_kwargs["gif_every"],
+        experiment_kwargs["gif_max_size"],
+        **automaton_kwargs,
+    )
+    print_plans(plans)
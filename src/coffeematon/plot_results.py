@@ -45,7 +45,7 @@ def plot_results(
 
     initstate, name, n = Automaton.str_to_parameters(
         csv_results_path.name.removesuffix(".csv")
-    )
+    )[:3]
 
     plt.figure()
     plt.title(f"{name.capitalize()} Automaton with initial state {initstate} (n={n})")
@@ -0,0 +1,264 @@
+"""Experiment service running jobs on a pool of warm worker processes.
+
+Jobs are JSON files moved between the state folders of a service directory,
+so that the client only needs the standard library and submitting a job does
+not pay for the heavy imports of the simulations.
+"""
+
+import argparse
+import json
+import multiprocessing
+import multiprocessing.pool
+import os
+import sys
+import traceback
+import uuid
+from contextlib import redirect_stderr, redirect_stdout
+from enum import Enum
+from pathlib import Path
+from time import monotonic, sleep, time_ns
+from typing import Any, Dict, List, Optional, Sequence
+
+DEFAULT_SERVICE_DIR = Path("data", "service")
+POLL_INTERVAL = 0.2
+
+
+class JobStates(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+def job_path(service_dir: Path, state: JobStates, job_id: str) -> Path:
+    return Path(service_dir) / state.value / f"{job_id}.json"
+
+
+def progress_path(service_dir: Path, job_id: str) -> Path:
+    return Path(service_dir) / JobStates.RUNNING.value / f"{job_id}.progress"
+
+
+def log_path(service_dir: Path, job_id: str) -> Path:
+    return Path(service_dir) / "logs" / f"{job_id}.log"
+
+
+def _write_json(path: Path, content: Dict[str, Any]) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w") as tmp_file:
+        json.dump(content, tmp_file, default=str)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "r") as json_file:
+            return json.load(json_file)
+    except FileNotFoundError:
+        return None
+
+
+def submit(argv: Sequence[str], service_dir: Path = DEFAULT_SERVICE_DIR) -> str:
+    """Submit an experiment given by its command line arguments, return its id."""
+    pending_dir = Path(service_dir) / JobStates.PENDING.value
+    os.makedirs(pending_dir, exist_ok=True)
+    # Ids sort in submission order
+    job_id = f"{time_ns()}-{uuid.uuid4().hex[:8]}"
+    _write_json(job_path(service_dir, JobStates.PENDING, job_id), {"args": argv})
+    return job_id
+
+
+def job_status(job_id: str, service_dir: Path = DEFAULT_SERVICE_DIR) -> Dict[str, Any]:
+    """Return the state of a job with its progress, result or error."""
+    for state in JobStates:
+        job = _read_json(job_path(service_dir, state, job_id))
+        if job is None:
+            continue
+        job["state"] = state.value
+        if state is JobStates.RUNNING:
+            job["progress"] = _read_json(progress_path(service_dir, job_id))
+        return job
+    raise KeyError(f"No job {job_id} in {service_dir}.")
+
+
+def wait(
+    job_id: str,
+    service_dir: Path = DEFAULT_SERVICE_DIR,
+    timeout: Optional[float] = None,
+    verbose: bool = False,
+) -> Dict[str, Any]:
+    """Wait for a job to be done or failed and return its status."""
+    t_start = monotonic()
+    while True:
+        status = job_status(job_id, service_dir)
+        if status["state"] in (JobStates.DONE.value, JobStates.FAILED.value):
+            return status
+        if verbose and status.get("progress") is not None:
+            progress = status["progress"]
+            print(f"Step {progress['step']}/{progress['n_steps']}", end="\r")
+        if timeout is not None and monotonic() - t_start > timeout:
+            raise TimeoutError(f"Job {job_id} is still {status['state']}.")
+        sleep(POLL_INTERVAL)
+
+
+def _warm_up():
+    """Import the simulations once per worker, before any job is run."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import coffeematon.__main__  # noqa: F401
+
+
+def run_job(job_id: str, service_dir: Path) -> None:
+    """Run a job in a worker and move it to the done or failed folder."""
+    from coffeematon.__main__ import (
+        AUTOMATONS,
+        experiment_for_n,
+        parse_experiment_args,
+    )
+
+    running_path = job_path(service_dir, JobStates.RUNNING, job_id)
+    job = _read_json(running_path)
+    if job is None:
+        # Failing the job rather than the worker keeps the service running
+        _write_json(
+            job_path(service_dir, JobStates.FAILED, job_id),
+            {"error": f"No job file {running_path}."},
+        )
+        return
+
+    def progress(step: int, n_steps: int) -> None:
+        _write_json(
+            progress_path(service_dir, job_id), {"step": step, "n_steps": n_steps}
+        )
+
+    os.makedirs(log_path(service_dir, job_id).parent, exist_ok=True)
+    with open(log_path(service_dir, job_id), "w") as log_file:
+        with redirect_stdout(log_file), redirect_stderr(log_file):
+            try:
+                automaton_type, n, init, experiment_kwargs, automaton_kwargs = (
+                    parse_experiment_args(job["args"])
+                )
+                mix_time, emax_val, cmax_time, cmax_val = experiment_for_n(
+                    automaton_type,
+                    n,
+                    init,
+                    progress=progress,
+                    **experiment_kwargs,
+                    **automaton_kwargs,
+                )
+                automaton = AUTOMATONS[automaton_type](
+                    n, init, save=False, **automaton_kwargs
+                )
+                paths = [automaton.csv_results_path(), *automaton.gif_paths().values()]
+                job["result"] = {
+                    "stats": {
+                        "mix_time": mix_time,
+                        "emax_val": emax_val,
+                        "cmax_time": cmax_time,
+                        "cmax_val": cmax_val,
+                    },
+                    "paths": [str(path.resolve()) for path in paths if path.exists()],
+                }
+                state = JobStates.DONE
+            except BaseException:
+                # Argument errors exit instead of raising
+                job["error"] = traceback.format_exc()
+                state = JobStates.FAILED
+    _write_json(job_path(service_dir, state, job_id), job)
+    os.remove(running_path)
+    if progress_path(service_dir, job_id).exists():
+        os.remove(progress_path(service_dir, job_id))
+
+
+def serve(
+    service_dir: Path = DEFAULT_SERVICE_DIR,
+    workers: Optional[int] = None,
+    max_jobs: Optional[int] = None,
+) -> None:
+    """Run pending jobs of the service directory on a pool of warm workers.
+
+    Jobs left running by a previous service are run again. The service stops
+    once max_jobs jobs are finished if given, and runs forever otherwise.
+    """
+    service_dir = Path(service_dir)
+    for state in JobStates:
+        os.makedirs(service_dir / state.value, exist_ok=True)
+    for running_path in (service_dir / JobStates.RUNNING.value).glob("*.json"):
+        job_id = running_path.stem
+        os.replace(running_path, job_path(service_dir, JobStates.PENDING, job_id))
+
+    n_jobs = 0
+    results: List[multiprocessing.pool.AsyncResult] = []
+    with multiprocessing.Pool(workers, initializer=_warm_up) as pool:
+        try:
+            while max_jobs is None or n_jobs < max_jobs:
+                pending_dir = service_dir / JobStates.PENDING.value
+                for pending_path in sorted(pending_dir.glob("*.json")):
+                    if max_jobs is not None and n_jobs >= max_jobs:
+                        break
+                    job_id = pending_path.stem
+                    os.replace(
+                        pending_path, job_path(service_dir, JobStates.RUNNING, job_id)
+                    )
+                    results.append(pool.apply_async(run_job, (job_id, service_dir)))
+                    n_jobs += 1
+                    print(f"Started job {job_id}.")
+                # Surface errors of the service itself, job errors are recorded
+                for result in results:
+                    if result.ready():
+                        result.get()
+                results = [result for result in results if not result.ready()]
+                sleep(POLL_INTERVAL)
+            for result in results:
+                result.get()
+        except KeyboardInterrupt:
+            print("Stopping the service, running jobs will be run again on restart.")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m coffeematon.service",
+        description="Run experiments on a pool of warm worker processes.",
+    )
+    parser.add_argument(
+        "--service-dir",
+        help="Directory of the service jobs.",
+        type=Path,
+        default=DEFAULT_SERVICE_DIR,
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve_parser = subparsers.add_parser("serve", help="Start the service.")
+    serve_parser.add_argument(
+        "--workers", help="Number of worker processes.", type=int, default=None
+    )
+    submit_parser = subparsers.add_parser(
+        "submit",
+        help="Submit an experiment, given by the arguments of python -m coffeematon.",
+    )
+    submit_parser.add_argument(
+        "--wait", help="Wait for the experiment to finish.", action="store_true"
+    )
+    submit_parser.add_argument("args", nargs=argparse.REMAINDER)
+    status_parser = subparsers.add_parser("status", help="Show the status of a job.")
+    status_parser.add_argument("job_id")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        serve(args.service_dir, args.workers)
+    elif args.command == "submit":
+        experiment_args = args.args
+        if experiment_args[:1] == ["--"]:
+            experiment_args = experiment_args[1:]
+        job_id = submit(experiment_args, args.service_dir)
+        print(job_id)
+        if args.wait:
+            status = wait(job_id, args.service_dir, verbose=True)
+            print(json.dumps(status, indent=2))
+            if status["state"] == JobStates.FAILED.value:
+                sys.exit(1)
+    else:
+        print(json.dumps(job_status(args.job_id, args.service_dir), indent=2))
+
+
+if __name__ == "__main__":
+    main()
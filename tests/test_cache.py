@@ -0,0 +1,88 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from coffeematon.__main__ import experiment_for_n
+from coffeematon.automatons.int_automaton import InteractingAutomaton
+from coffeematon import cache as cache_module
+from coffeematon.cache import ResultCache, config_key
+
+import pytest
+
+
+def test_cache_roundtrip(tmp_path):
+    cache = ResultCache(tmp_path)
+    config = {"automaton": "int", "n": 10, "seed": 0}
+    assert cache.get(config) is None
+    csv_path = tmp_path / "results.csv"
+    csv_path.write_text("Timestep,Fine\n0,10\n")
+    cache.put(config, {"mix_time": 1}, csv_path)
+    cached = cache.get(config)
+    assert cached["stats"] == {"mix_time": 1}
+    assert cached["csv_path"].read_text() == csv_path.read_text()
+    assert cache.get(dict(config, seed=1)) is None
+
+
+def test_cache_concurrent_puts(tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    config = {"automaton": "int", "n": 10, "seed": 0}
+    csv_path = tmp_path / "results.csv"
+    csv_path.write_text("Timestep,Fine\n0,10\n")
+    with ThreadPoolExecutor(8) as executor:
+        for result in [
+            executor.submit(cache.put, config, {"mix_time": 1}, csv_path)
+            for _ in range(64)
+        ]:
+            result.result()
+    assert cache.get(config)["csv_path"].read_text() == csv_path.read_text()
+    assert [path.name for path in cache.cache_dir.iterdir()] == [config_key(config)]
+
+
+def test_cache_put_adds_csv_results(tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    config = {"n": 1}
+    cache.put(config, {"mix_time": 1})
+    assert cache.get(config)["csv_path"] is None
+    csv_path = tmp_path / "results.csv"
+    csv_path.write_text("Timestep,Fine\n0,10\n")
+    cache.put(config, {"mix_time": 1}, csv_path)
+    assert cache.get(config)["csv_path"] is not None
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(tmp_path, max_size=0)
+    cache.put({"n": 1}, {"mix_time": 1})
+    assert cache.get({"n": 1}) is None
+
+
+def test_experiment_for_n_reuses_cache(tmp_path, monkeypatch):
+    cache = ResultCache(tmp_path)
+    stats = experiment_for_n("int", 10, save=False, cache=cache, seed=0)
+
+    def fail_simulate(*args, **kwargs):
+        raise AssertionError("Simulation should not run on cache hit.")
+
+    monkeypatch.setattr(InteractingAutomaton, "simulate", fail_simulate)
+    assert experiment_for_n("int", 10, save=False, cache=cache, seed=0) == stats
+    with pytest.raises(AssertionError):
+        experiment_for_n("int", 10, save=False, cache=cache, seed=1)
+
+
+def test_experiment_for_n_caches_seeded_runs_only(tmp_path):
+    cache = ResultCache(tmp_path)
+    experiment_for_n("int", 10, save=False, cache=cache)
+    assert not any(tmp_path.iterdir())
+
+
+def test_experiment_for_n_runs_again_to_save_results(tmp_path, monkeypatch):
+    cache = ResultCache(tmp_path / "cache")
+    monkeypatch.chdir(tmp_path)
+    experiment_for_n("int", 10, save=False, cache=cache, seed=0, max_save_steps=10)
+    automaton = InteractingAutomaton(10, save=False, seed=0)
+    assert not automaton.csv_results_path().exists()
+    experiment_for_n("int", 10, save=True, cache=cache, seed=0, max_save_steps=10)
+    assert automaton.csv_results_path().exists()
+
+
+def test_config_key_depends_on_source(monkeypatch):
+    key = config_key({"n": 10})
+    monkeypatch.setattr(cache_module, "source_hash", lambda: "changed")
+    assert config_key({"n": 10}) != key
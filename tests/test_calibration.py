@@ -0,0 +1,22 @@
+import numpy as np
+
+from coffeematon.automatons.automaton import ESTIMATORS, ArrayTypes
+from coffeematon.automatons.int_automaton import InteractingAutomaton
+from coffeematon.calibration import calibration_report
+
+
+def test_calibration_report(tmp_path):
+    automaton = InteractingAutomaton(10, seed=0)
+    automaton.results_dir = tmp_path
+    csv_path = automaton.simulate(
+        max_save_steps=50,
+        array_types=[ArrayTypes.FINE, ArrayTypes.COARSE_3, *ESTIMATORS],
+    )
+    report = calibration_report(csv_path)
+    assert set(report) == {"Rle_fine", "Rle_coarse_3", "Condh_fine", "Condh_coarse_3"}
+    assert report["Condh_fine"]["gzip"] == "Fine"
+    for stats in report.values():
+        assert stats["ratio"] > 0
+        assert -1 <= stats["spearman"] <= 1 or np.isnan(stats["spearman"])
+    # The estimators track the gzip size of their source array
+    assert report["Condh_fine"]["pearson"] > 0.5
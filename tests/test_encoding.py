@@ -0,0 +1,143 @@
+from coffeematon.encoding import (
+    DeltaZipper,
+    Serialization,
+    TiledZipper,
+    category_indices,
+    conditional_entropy,
+    level_indices,
+    run_length_entropy,
+    serialize_array,
+    zip_array,
+)
+
+import numpy as np
+
+
+def test_category_indices():
+    array = np.array([[0.5, 1.0], [0.0, 0.5]])
+    indices = category_indices(array)
+    assert indices.dtype == np.uint8
+    assert np.all(indices == np.array([[1, 2], [0, 1]]))
+
+
+def test_category_indices_of_integers_are_canonical():
+    counts = np.array([[3.0, 1.0], [3.0, 3.0]])
+    assert np.all(category_indices(counts) == counts)
+    assert category_indices(counts).dtype == np.uint8
+
+
+def test_level_indices_are_canonical():
+    # The same level maps to the same index whichever other levels are present
+    assert level_indices(np.array([0.0, 1.0]), 0.5).tolist() == [0, 2]
+    assert level_indices(np.array([0.5, 1.0]), 0.5).tolist() == [1, 2]
+    # Coarse-graining bins wider than the nominal bin size keep levels distinct
+    assert level_indices(np.array([0.0, 0.55, 1.1]), 0.5).tolist() == [0, 1, 2]
+    assert level_indices(np.array([0.0, 300.0]), 1.0) is None
+
+
+def test_estimators_uniform_array():
+    array = np.ones((20, 20))
+    assert run_length_entropy(array) == 0
+    assert conditional_entropy(array) == 0
+
+
+def test_estimators_order_structured_below_random():
+    rng = np.random.default_rng(0)
+    updown = np.zeros((50, 50))
+    updown[:25] = 1.0
+    mixed = rng.integers(0, 2, size=(50, 50)).astype(float)
+    assert run_length_entropy(updown) < run_length_entropy(mixed)
+    assert conditional_entropy(updown) < conditional_entropy(mixed)
+
+
+def test_conditional_entropy_random_close_to_one_bit_per_cell():
+    rng = np.random.default_rng(0)
+    mixed = rng.integers(0, 2, size=(100, 100)).astype(float)
+    assert abs(conditional_entropy(mixed) - 100 * 100 / 8) < 0.05 * 100 * 100 / 8
+
+
+def test_tiled_zipper_sums_tiles():
+    rng = np.random.default_rng(0)
+    array = rng.random((10, 10))
+    zipper = TiledZipper(tile_size=4)
+    expected = sum(
+        zip_array(np.ascontiguousarray(array[i : i + 4, j : j + 4]))
+        for i in range(0, 10, 4)
+        for j in range(0, 10, 4)
+    )
+    assert zipper.zip_array(array) == expected
+    zipper.close()
+
+
+def test_tiled_zipper_caches_identical_tiles():
+    zipper = TiledZipper(tile_size=4)
+    array = np.zeros((16, 16))
+    size = zipper.zip_array(array)
+    assert len(zipper.cache) == 1
+    array[0, 0] = 1.0
+    assert zipper.zip_array(array) >= size
+    assert len(zipper.cache) == 2
+    zipper.close()
+
+
+def test_serialize_categories():
+    coarse = np.array([[0.0, 0.5], [1.0, 0.5]])
+    serialized = serialize_array(coarse, Serialization.CATEGORIES)
+    assert serialized == bytes([0, 1, 2, 1])
+
+
+def test_serialize_categories_falls_back_to_raw():
+    fine = np.arange(300, dtype=float).reshape(10, 30)
+    assert serialize_array(fine, Serialization.CATEGORIES) == fine.tobytes()
+
+
+def test_serialize_levels():
+    coarse = np.array([[0.5, 1.0], [1.0, 0.5]])
+    assert serialize_array(coarse, Serialization.LEVELS, 0.5) == bytes([1, 2, 2, 1])
+    assert serialize_array(coarse, Serialization.LEVELS) == bytes([0, 1, 1, 0])
+
+
+def test_serialize_diff_grid():
+    diff = np.array([[0.5, 1.0], [0.0, 0.5]])
+    assert serialize_array(diff, Serialization.DIFF_GRID) == bytes([0, 2, 1, 0])
+    diff[0, 0] = 1.0
+    assert len(serialize_array(diff, Serialization.DIFF_GRID)) == diff.size
+
+
+def test_serialize_bits():
+    mask = np.zeros((4, 4), dtype=bool)
+    mask[0, 0] = True
+    assert serialize_array(mask, Serialization.BITS) == bytes([128, 0])
+
+
+def test_serialize_diff():
+    diff = np.array([[0.5, 0.5], [0.0, 1.0]])
+    assert serialize_array(diff, Serialization.DIFF) == bytes([192, 0, 1])
+
+
+def test_delta_zipper_conditions_on_previous_array():
+    rng = np.random.default_rng(0)
+    array = rng.integers(0, 2, size=(50, 50)).astype(float)
+    zipper = DeltaZipper()
+    first = zipper.zip_array("fine", array, Serialization.CATEGORIES)
+    assert first == zip_array(array, serialization=Serialization.CATEGORIES)
+    assert zipper.zip_array("fine", array, Serialization.CATEGORIES) < first / 10
+    assert zipper.zip_array("other", array, Serialization.CATEGORIES) == first
+
+
+def test_delta_zipper_uses_previous_array_as_dictionary():
+    rng = np.random.default_rng(0)
+    array = rng.integers(0, 2, size=(50, 50)).astype(float)
+    changed = array.copy()
+    changed[:10] = 1 - changed[:10]
+    zipper = DeltaZipper()
+    zipper.zip_array("fine", array, Serialization.CATEGORIES)
+    first = zip_array(changed, serialization=Serialization.CATEGORIES)
+    assert zipper.zip_array("fine", changed, Serialization.CATEGORIES) < first / 2
+
+
+def test_conditional_entropy_charges_new_neighbourhoods():
+    rng = np.random.default_rng(0)
+    continuous = rng.random((100, 100))
+    # Every neighbourhood is new, each cell costs about log2 of the 10000 values
+    assert conditional_entropy(continuous) > 0.9 * 100 * 100 * np.log2(10000) / 8
@@ -0,0 +1,49 @@
+import numpy as np
+from PIL import Image
+
+from coffeematon.automatons.automaton import save_image
+from coffeematon.generate_gifs import GifWriter, array_to_frame, generate_gif
+
+
+def read_frames(gif_path):
+    frames = []
+    with Image.open(gif_path) as image:
+        for i in range(image.n_frames):
+            image.seek(i)
+            frames.append(np.asarray(image.convert("L")))
+    return frames
+
+
+def test_gif_writer_appends_frames(tmp_path):
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, size=(12, 12), dtype=np.uint8) for _ in range(5)]
+    gif_path = tmp_path / "frames.gif"
+    with GifWriter(gif_path) as writer:
+        for frame in frames:
+            writer.append(frame)
+    assert all(np.array_equal(a, b) for a, b in zip(read_frames(gif_path), frames))
+    assert len(read_frames(gif_path)) == 5
+
+
+def test_gif_writer_decimates_and_downscales(tmp_path):
+    gif_path = tmp_path / "frames.gif"
+    with GifWriter(gif_path, every=2, max_size=5) as writer:
+        for i in range(5):
+            writer.append(np.full((20, 20), i, dtype=np.uint8))
+    frames = read_frames(gif_path)
+    assert [frame[0, 0] for frame in frames] == [0, 2, 4]
+    assert all(frame.shape == (5, 5) for frame in frames)
+
+
+def test_generate_gif_matches_incremental_gif(tmp_path):
+    rng = np.random.default_rng(0)
+    arrays = [rng.random((10, 10)) for _ in range(4)]
+    bitmaps_dir = tmp_path / "fine"
+    bitmaps_dir.mkdir()
+    incremental_path = tmp_path / "incremental.gif"
+    with GifWriter(incremental_path) as writer:
+        for step, array in enumerate(arrays):
+            save_image(array, bitmaps_dir / f"{step * 10}.bmp", 10)
+            writer.append(array_to_frame(array))
+    gif_path = generate_gif(bitmaps_dir)
+    assert gif_path.read_bytes() == incremental_path.read_bytes()
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from coffeematon.__main__ import parse_experiment_args
+from coffeematon.automatons.automaton import InitialStates
+from coffeematon.automatons.fluid_automaton import FluidAutomaton
+from coffeematon.automatons.int_automaton import InteractingAutomaton
+from coffeematon.automatons.nonint_automaton import NonInteractingAutomaton
+from coffeematon.initial_states import (
+    blobs_mask,
+    circular_mask,
+    drops_mask,
+    stripes_mask,
+    updown_mask,
+)
+
+
+@pytest.mark.parametrize("n", [7, 10, 31])
+def test_circular_mask_matches_loop(n):
+    expected = np.zeros((n, n), dtype=bool)
+    for x in range(n):
+        for y in range(n):
+            if np.sqrt((x - n / 2) ** 2 + (y - n / 2) ** 2) < n / 4:
+                expected[x, y] = True
+    assert np.array_equal(circular_mask(n), expected)
+
+
+def test_single_shapes_match_base_states():
+    assert np.array_equal(drops_mask(20, 1), circular_mask(20))
+    assert np.array_equal(stripes_mask(20, 1), updown_mask(20))
+
+
+def test_masks_are_cached_and_read_only():
+    assert drops_mask(20, 3) is drops_mask(20, 3)
+    with pytest.raises(ValueError):
+        drops_mask(20, 3)[0, 0] = True
+
+
+def test_blobs_mask_depends_on_seed():
+    assert np.array_equal(blobs_mask(30, 4, 0), blobs_mask.__wrapped__(30, 4, 0))
+    assert not np.array_equal(blobs_mask(30, 4, 0), blobs_mask(30, 4, 1))
+    assert blobs_mask(30, 4, 0).any()
+
+
+@pytest.mark.parametrize(
+    "automaton_type", [InteractingAutomaton, NonInteractingAutomaton, FluidAutomaton]
+)
+@pytest.mark.parametrize(
+    "initial_state", [InitialStates.DROPS, InitialStates.STRIPES, InitialStates.BLOBS]
+)
+def test_automatons_start_from_shaped_states(automaton_type, initial_state):
+    automaton = automaton_type(10, initial_state, save=False, n_shapes=2)
+    automaton.start()
+    assert np.array_equal(automaton.cells, automaton.initial_mask().astype(float))
+    assert automaton.parameters[0].startswith(f"{initial_state.value}-2")
+
+
+def test_shaped_states_need_a_shape():
+    with pytest.raises(ValueError, match="n_shapes"):
+        InteractingAutomaton(10, InitialStates.DROPS, n_shapes=0)
+    with pytest.raises(SystemExit):
+        parse_experiment_args(
+            ["-a", "int", "-n", "10", "--init", "stripes", "--shapes", "0"]
+        )
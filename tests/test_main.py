@@ -1,3 +1,7 @@
+import numpy as np
+import pytest
+
+from coffeematon.automatons.automaton import TEMPORAL, ArrayTypes
 from coffeematon.automatons.fluid_automaton import FluidAutomaton
 from coffeematon.automatons.int_automaton import InteractingAutomaton
 from coffeematon.automatons.nonint_automaton import NonInteractingAutomaton
@@ -18,6 +22,31 @@ def test_fluid():
     automaton.simulate()
 
 
+def test_fluid_adaptive():
+    automaton = FluidAutomaton(10, adaptive=True, save=False)
+    automaton.simulate()
+    assert automaton.steps == list(range(automaton.esttime))
+    # Unit steps make one pressure solve per step
+    assert automaton.n_solves < automaton.esttime - 1
+
+
+def test_fluid_adaptive_follows_mixing_curve():
+    fixed = FluidAutomaton(30, save=False)
+    adaptive = FluidAutomaton(30, adaptive=True, save=False)
+    peaks = []
+    for automaton in (fixed, adaptive):
+        automaton.simulate(array_types=[ArrayTypes.COARSE_7])
+        complexities = automaton.complexities[ArrayTypes.COARSE_7]
+        peak = int(np.argmax(complexities))
+        peaks.append((automaton.steps[peak], complexities[peak]))
+    (fixed_time, fixed_value), (adaptive_time, adaptive_value) = peaks
+    assert fixed.n_solves == fixed.esttime - 1
+    assert adaptive.n_solves < 0.6 * fixed.n_solves
+    # Tolerances stated in FluidAutomaton.advance
+    assert adaptive_value == pytest.approx(fixed_value, rel=0.05)
+    assert adaptive_time == pytest.approx(fixed_time, rel=0.1)
+
+
 def test_int_circular():
     automaton = InteractingAutomaton(10, initial_state="circular", save=False)
     automaton.simulate()
@@ -31,3 +60,210 @@ def test_nonint_circular():
 def test_fluid_circular():
     automaton = FluidAutomaton(10, initial_state="circular", save=False)
     automaton.simulate()
+
+
+def test_int_tiled():
+    automaton = InteractingAutomaton(10, save=False, tile_size=4)
+    automaton.simulate()
+    assert len(automaton.complexities[ArrayTypes.TILED_FINE]) == len(automaton.steps)
+
+
+def test_int_iter_snapshots(tmp_path):
+    automaton = InteractingAutomaton(10)
+    automaton.results_dir = tmp_path
+    array_types = [ArrayTypes.FINE, ArrayTypes.MASK_7, ArrayTypes.RLE_COARSE_3]
+    snapshots = list(
+        automaton.iter_snapshots(max_save_steps=10, array_types=array_types)
+    )
+    assert [snapshot.step for snapshot in snapshots] == automaton.steps
+    assert len(snapshots) == 10
+    for snapshot in snapshots:
+        assert set(snapshot.arrays) == {
+            ArrayTypes.FINE,
+            ArrayTypes.MASK_7,
+            ArrayTypes.COARSE_3,
+        }
+        assert set(snapshot.complexities) == set(array_types)
+    first_fine = snapshots[0].arrays[ArrayTypes.FINE]
+    assert np.any(first_fine != snapshots[-1].arrays[ArrayTypes.FINE])
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_int_iter_snapshots_twice():
+    automaton = InteractingAutomaton(10, save=False, seed=0, tile_size=4)
+    first = [s.complexities for s in automaton.iter_snapshots(max_save_steps=10)]
+    assert automaton.tiled_zipper._executor is None
+    steps = list(automaton.steps)
+    second = [s.complexities for s in automaton.iter_snapshots(max_save_steps=10)]
+    assert automaton.steps == steps
+    assert all(len(c_vals) == 10 for c_vals in automaton.complexities.values())
+    assert second == first
+
+
+def test_int_iter_snapshots_closed_early():
+    automaton = InteractingAutomaton(10, save=False, seed=0, tile_size=4)
+    snapshots = automaton.iter_snapshots(max_save_steps=10)
+    next(snapshots)
+    assert automaton.tiled_zipper._executor is not None
+    snapshots.close()
+    assert automaton.tiled_zipper._executor is None
+
+
+def test_int_resume_from_checkpoint(tmp_path):
+    reference = InteractingAutomaton(10, seed=0)
+    reference.results_dir = tmp_path / "reference"
+    reference_csv = reference.simulate(max_save_steps=100)
+
+    class Interrupted(Exception):
+        pass
+
+    class InterruptedAutomaton(InteractingAutomaton):
+        def advance(self, k):
+            if self.step >= 100000:
+                raise Interrupted()
+            super().advance(k)
+
+    interrupted = InterruptedAutomaton(10, seed=0)
+    interrupted.results_dir = tmp_path / "resumed"
+    with pytest.raises(Interrupted):
+        interrupted.simulate(max_save_steps=100, checkpoint_every=7)
+    assert interrupted.checkpoint_path().exists()
+
+    resumed = InteractingAutomaton(10, seed=0)
+    resumed.results_dir = tmp_path / "resumed"
+    resumed_csv = resumed.simulate(max_save_steps=100, resume=True)
+    assert resumed.steps == reference.steps
+    assert resumed.complexities == reference.complexities
+    assert open(resumed_csv).read() == open(reference_csv).read()
+    assert not resumed.checkpoint_path().exists()
+    # Incrementally encoded gifs match the gifs rendered from bitmaps on resume
+    reference_gifs = reference.gif_paths()
+    for c_type, gif_path in resumed.gif_paths().items():
+        assert gif_path.read_bytes() == reference_gifs[c_type].read_bytes()
+
+
+@pytest.mark.parametrize(
+    "kwargs, mismatch",
+    [
+        ({"tile_size": 4}, "tile_size"),
+        ({"legacy_serialization": True}, "legacy_serialization"),
+        ({"array_types": [ArrayTypes.FINE]}, "array types"),
+    ],
+)
+def test_resume_rejects_other_configuration(tmp_path, kwargs, mismatch):
+    array_types = kwargs.pop("array_types", None)
+    automaton = NonInteractingAutomaton(10, seed=0, save=False)
+    automaton.results_dir = tmp_path
+    automaton.start()
+    automaton.save_checkpoint(1000, 10)
+
+    other = NonInteractingAutomaton(10, seed=0, save=False, **kwargs)
+    other.results_dir = tmp_path
+    if array_types is not None:
+        other.select_array_types(array_types)
+    with pytest.raises(ValueError, match=mismatch):
+        other.load_checkpoint(1000, 10)
+
+
+def test_nonint_mean_field():
+    automaton = NonInteractingAutomaton(10, mean_field=True, save=False)
+    automaton.simulate()
+    assert automaton.cells.sum() == pytest.approx(50.0)
+    assert automaton.cells.max() < 1.0
+
+
+@pytest.mark.parametrize("n", [10, 100])
+@pytest.mark.parametrize("fluctuations", ["poisson", "binomial"])
+def test_nonint_mean_field_fluctuations(n, fluctuations):
+    automaton = NonInteractingAutomaton(
+        n, mean_field=True, fluctuations=fluctuations, save=False
+    )
+    # Snapshots of the large grid are spectral jumps
+    automaton.simulate(n_steps=1000, max_save_steps=20)
+    assert np.all(automaton.cells >= 0)
+
+
+def test_int_advance_is_seeded_and_conservative():
+    automatons = [InteractingAutomaton(10, seed=0) for _ in range(2)]
+    for automaton in automatons:
+        automaton.set_initial_state()
+        automaton.advance(1000)
+    assert automatons[0].cells.sum() == 50
+    assert np.all(automatons[0].cells == automatons[1].cells)
+
+
+def test_int_cells_materialized_lazily():
+    automaton = InteractingAutomaton(10, seed=0)
+    automaton.set_initial_state()
+    automaton.advance(1000)
+    assert automaton._cells is None
+    cells = automaton.cells
+    assert automaton.cells is cells
+    assert cells.sum() == 50
+
+
+@pytest.mark.parametrize(
+    "automaton",
+    [
+        InteractingAutomaton(10, seed=0, save=False),
+        NonInteractingAutomaton(10, seed=0, save=False),
+        NonInteractingAutomaton(10, seed=0, save=False, mean_field=True),
+        FluidAutomaton(10, seed=0, save=False),
+        FluidAutomaton(10, seed=0, save=False, adaptive=True),
+    ],
+    ids=lambda automaton: "-".join(automaton.parameters[1:3]),
+)
+def test_assigned_cells_are_advanced(automaton):
+    automaton.start()
+    automaton.advance(3)
+    automaton.cells = np.zeros((10, 10))
+    automaton.advance(10)
+    assert automaton.cells.sum() == pytest.approx(0.0)
+
+
+def test_int_snapshot_schedule():
+    automaton = InteractingAutomaton(10, seed=0, save=False)
+    automaton.simulate(n_steps=1005, max_save_steps=10)
+    assert automaton.steps == list(range(0, 1005, 100))
+    assert automaton.step == 1004
+
+
+def test_nonint_mean_field_advance_matches_steps():
+    jumped = NonInteractingAutomaton(10, mean_field=True)
+    jumped.set_initial_state()
+    jumped.advance(100)
+    stepped = NonInteractingAutomaton(10, mean_field=True)
+    stepped.set_initial_state()
+    for _ in range(100):
+        stepped.next()
+    assert np.allclose(jumped.cells, stepped.cells)
+
+
+def test_temporal_complexity_at_most_standalone():
+    # Snapshots of this size exceed the window of zlib preset dictionaries
+    automaton = InteractingAutomaton(200, seed=0, save=False)
+    array_types = [ArrayTypes.TEMPORAL_FINE, ArrayTypes.TEMPORAL_COARSE_7]
+    automaton.simulate(
+        n_steps=4_000_000,
+        max_save_steps=5,
+        array_types=[*array_types, *(TEMPORAL[c_type] for c_type in array_types)],
+    )
+    for c_type in array_types:
+        temporal = np.array(automaton.complexities[c_type])
+        standalone = np.array(automaton.complexities[TEMPORAL[c_type]])
+        assert np.all(temporal <= standalone + 1)
+
+
+def test_fine_estimators_only_for_discrete_cells():
+    assert ArrayTypes.CONDH_FINE in InteractingAutomaton(10, save=False).complexities
+    assert ArrayTypes.CONDH_FINE not in FluidAutomaton(10, save=False).complexities
+    mean_field = NonInteractingAutomaton(10, save=False, mean_field=True)
+    assert ArrayTypes.CONDH_FINE not in mean_field.complexities
+    assert ArrayTypes.RLE_COARSE_3 in mean_field.complexities
+
+
+def test_opt_in_estimators_measured_when_selected():
+    automaton = InteractingAutomaton(10, seed=0, save=False)
+    assert ArrayTypes.CONDH_COARSE_3 not in automaton.complexities
+    automaton.simulate(array_types=[ArrayTypes.CONDH_COARSE_3], max_save_steps=5)
+    assert len(automaton.complexities[ArrayTypes.CONDH_COARSE_3]) == 5
@@ -0,0 +1,33 @@
+from coffeematon.planner import benchmark, main, plan_runs
+
+
+def test_benchmark_measures_costs():
+    result = benchmark("int", 10, max_save_steps=10)
+    assert result.n == 10
+    assert result.step_time > 0
+    assert result.snapshot_time > 0
+    assert result.gif_time > 0
+    assert result.peak_memory > 0
+
+
+def test_plan_runs_scales_with_n():
+    plans = plan_runs("nonint", [20, 10, 15], max_save_steps=10)
+    assert [plan.n for plan in plans] == [10, 15, 20]
+    assert [plan.n_steps for plan in plans] == [1000, 1500, 2000]
+    assert all(plan.n_snapshots == 10 for plan in plans)
+    assert plans[0].disk_usage < plans[1].disk_usage < plans[2].disk_usage
+    assert all(plan.wall_time > 0 for plan in plans)
+
+
+def test_plan_runs_accounts_for_run_options():
+    plan = plan_runs("int", [10], max_save_steps=10)[0]
+    small_gifs = plan_runs("int", [10], max_save_steps=10, gif_every=5, gif_max_size=4)
+    assert small_gifs[0].disk_usage < plan.disk_usage
+    # Tiled columns are recorded in the csv results
+    tiled = plan_runs("int", [10], max_save_steps=10, tile_size=4)
+    assert tiled[0].disk_usage > plan.disk_usage
+
+
+def test_main_takes_experiment_arguments(capsys):
+    main(["-a", "nonint", "-n", "10", "--mean-field", "--max-save-steps", "5"])
+    assert "1,000" in capsys.readouterr().out
@@ -0,0 +1,65 @@
+import pytest
+
+from coffeematon.automatons.nonint_automaton import NonInteractingAutomaton
+from coffeematon.service import JobStates, job_status, run_job, serve, submit
+
+
+def test_service_runs_submitted_jobs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    service_dir = tmp_path / "service"
+    job_id = submit(
+        ["-a", "nonint", "-n", "6", "--seed", "0", "--no-cache"], service_dir
+    )
+    failing_id = submit(["-a", "nonint"], service_dir)
+    assert job_status(job_id, service_dir)["state"] == JobStates.PENDING.value
+
+    serve(service_dir, workers=1, max_jobs=2)
+
+    status = job_status(job_id, service_dir)
+    assert status["state"] == JobStates.DONE.value
+    assert status["result"]["stats"]["mix_time"] == 599
+    assert any(path.endswith(".csv") for path in status["result"]["paths"])
+    assert any(path.endswith("_fine.gif") for path in status["result"]["paths"])
+    failed = job_status(failing_id, service_dir)
+    assert failed["state"] == JobStates.FAILED.value
+    assert "SystemExit" in failed["error"]
+
+
+def test_service_resumes_jobs_with_gifs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    args = ["-a", "nonint", "-n", "6", "--seed", "0", "--no-cache"]
+
+    def interrupt(step, n_steps):
+        if step > 0:
+            raise KeyboardInterrupt()
+
+    automaton = NonInteractingAutomaton(6, seed=0)
+    with pytest.raises(KeyboardInterrupt):
+        automaton.simulate(checkpoint_every=1, progress=interrupt)
+    assert automaton.checkpoint_path().exists()
+
+    service_dir = tmp_path / "service"
+    job_id = submit([*args, "--resume", "--checkpoint-every", "1"], service_dir)
+    serve(service_dir, workers=1, max_jobs=1)
+
+    status = job_status(job_id, service_dir)
+    assert status["state"] == JobStates.DONE.value, status.get("error")
+    assert any(path.endswith("_fine.gif") for path in status["result"]["paths"])
+
+
+def test_jobs_of_different_seeds_have_different_paths():
+    paths = {
+        NonInteractingAutomaton(6, save=False, seed=seed).csv_results_path()
+        for seed in (None, 0, 1)
+    }
+    assert len(paths) == 3
+
+
+def test_run_job_without_job_file(tmp_path):
+    service_dir = tmp_path / "service"
+    (service_dir / JobStates.RUNNING.value).mkdir(parents=True)
+    (service_dir / JobStates.FAILED.value).mkdir()
+    run_job("missing", service_dir)
+    status = job_status("missing", service_dir)
+    assert status["state"] == JobStates.FAILED.value
+    assert "No job file" in status["error"]